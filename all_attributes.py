@@ -120,3 +120,332 @@ print(
     set(type(pineapple_instance).__dict__.keys()),
 )
 
+
+print("-"*20)
+
+
+# (3) remembering the __getattr__ fallback
+# a failed lookup is never remembered: every pineapple_instance.caught_by_attr runs the whole (1.2)-(1.4) search,
+# fails, and calls Pineapple.__getattr__ again (and prints again).
+# when __getattr__ computes something expensive (e.g. a proxy that builds attributes on demand), the mixin below
+# keeps its results, and its AttributeErrors, in a bounded LRU cache, per instance or per class:
+#     class CachedPineapple(CachedGetattrMixin, Pineapple, getattr_cache='instance', getattr_cache_size=128)
+# the mixin must come before the class that defines __getattr__, its __getattr__ calls the next one in the MRO.
+# the lookup order does not change: the cache is only consulted from __getattr__, i.e. after data descriptors,
+# the instance dict, non-data descriptors and class attributes have all missed, so anything added to those later
+# still wins. What __getattr__ computes usually depends on the other attributes of the instance, so any
+# __setattr__/__delattr__ on an instance clears its whole cache (the whole class cache with getattr_cache='class').
+# the instance cache is stored on the instance as _getattr_instance_cache: a class with __slots__ (and no __dict__)
+# must list that name in its __slots__, or use getattr_cache='class', it is checked when the class is created.
+from collections import OrderedDict
+
+
+class CachedGetattrMixin:
+    __slots__ = ()
+
+    def __init_subclass__(cls, getattr_cache='instance', getattr_cache_size=128, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if getattr_cache not in ('instance', 'class'):
+            raise ValueError(f"getattr_cache should be 'instance' or 'class', got {getattr_cache!r}")
+        if getattr_cache == 'instance' and not cls.__dictoffset__ and not hasattr(cls, '_getattr_instance_cache'):
+            raise TypeError(f"{cls.__name__} has no __dict__: add '_getattr_instance_cache' to its __slots__, "
+                            f"or use getattr_cache='class'")
+        cls._getattr_cache_scope = getattr_cache
+        cls._getattr_cache_size = getattr_cache_size
+        if getattr_cache == 'class':
+            cls._getattr_class_cache = OrderedDict()
+
+    def _getattr_cache(self):
+        if self._getattr_cache_scope == 'class':
+            return self._getattr_class_cache
+        # object.__getattribute__ does not fall back to __getattr__, so a missing cache cannot recurse
+        try:
+            return object.__getattribute__(self, '_getattr_instance_cache')
+        except AttributeError:
+            cache = OrderedDict()
+            object.__setattr__(self, '_getattr_instance_cache', cache)  # a slot, or the instance dict
+            return cache
+
+    def __getattr__(self, item):
+        cache = self._getattr_cache()
+        try:
+            found, value = cache[item]
+        except KeyError:
+            fallback = getattr(super(), '__getattr__', None)
+            try:
+                if fallback is None:
+                    raise AttributeError(f'{type(self).__name__!r} object has no attribute {item!r}')
+                found, value = True, fallback(item)
+            except AttributeError as e:
+                found, value = False, str(e)  # the message only, a stored exception would keep its traceback
+            cache[item] = (found, value)
+            if len(cache) > self._getattr_cache_size:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(item)
+        if found:
+            return value
+        raise AttributeError(value)
+
+    def _clear_getattr_cache(self):
+        if self._getattr_cache_scope == 'class':
+            self._getattr_class_cache.clear()
+            return
+        try:  # without creating a cache that was never needed (e.g. in __init__)
+            object.__getattribute__(self, '_getattr_instance_cache').clear()
+        except AttributeError:
+            pass
+
+    def __setattr__(self, key, value):
+        super().__setattr__(key, value)
+        self._clear_getattr_cache()
+
+    def __delattr__(self, item):
+        super().__delattr__(item)
+        self._clear_getattr_cache()
+
+
+class CachedPineapple(CachedGetattrMixin, Pineapple, getattr_cache_size=2):
+    pass
+
+
+cached_pineapple = CachedPineapple()
+for _ in range(3):
+    assert cached_pineapple.caught_by_attr == "Value(caught_by_attr)"
+"""
+Inside Pineapple.__getattr__()
+"""
+# "Inside Pineapple.__getattr__()" is printed only once for the three lookups, misses are remembered as well
+for _ in range(3):
+    try:
+        cached_pineapple.any_random_attr
+    except AttributeError as e:
+        print(e)
+"""
+Inside Pineapple.__getattr__()
+Invalid Item to Get
+Invalid Item to Get
+Invalid Item to Get
+"""
+
+# the lookup order is kept: the instance dict wins over the cached value, and deleting it brings the value back
+cached_pineapple.caught_by_attr = "instance value"
+assert cached_pineapple.caught_by_attr == "instance value"
+del cached_pineapple.caught_by_attr
+assert cached_pineapple.caught_by_attr == "Value(caught_by_attr)"  # computed again, the cached one was dropped
+# as do class attributes added after the value was cached, and data descriptors
+CachedPineapple.caught_by_attr = "class value"
+assert cached_pineapple.caught_by_attr == "class value"
+del CachedPineapple.caught_by_attr
+CachedPineapple.caught_by_attr = property(lambda self: "descriptor value")
+assert cached_pineapple.caught_by_attr == "descriptor value"
+del CachedPineapple.caught_by_attr
+
+# the cache holds at most getattr_cache_size names, the least recently used one is evicted
+assert list(cached_pineapple._getattr_instance_cache) == ['caught_by_attr']
+for name in ['any_random_attr', 'other_random_attr']:
+    try:
+        getattr(cached_pineapple, name)
+    except AttributeError:
+        pass
+assert list(cached_pineapple._getattr_instance_cache) == ['any_random_attr', 'other_random_attr']
+# and any attribute written on the instance clears it
+cached_pineapple.tree_value = 'new value'
+assert not cached_pineapple._getattr_instance_cache
+
+
+# with __slots__, the instance cache needs a slot of its own
+class SlottedProxy:
+    __slots__ = ('target',)
+
+    def __init__(self, target):
+        self.target = target
+
+    def __getattr__(self, item):
+        return getattr(self.target, item)
+
+
+try:
+    class CachedSlottedProxy(CachedGetattrMixin, SlottedProxy):
+        __slots__ = ()
+except TypeError as e:
+    print(e)
+"""
+CachedSlottedProxy has no __dict__: add '_getattr_instance_cache' to its __slots__, or use getattr_cache='class'
+"""
+
+
+class CachedSlottedProxy(CachedGetattrMixin, SlottedProxy):
+    __slots__ = ('_getattr_instance_cache',)
+
+
+slotted_proxy = CachedSlottedProxy(Tree())
+assert slotted_proxy.export == 'Tree' and list(slotted_proxy._getattr_instance_cache) == ['export']
+assert not CachedSlottedProxy.__dictoffset__  # no __dict__ in the instances
+other_tree = Tree()
+other_tree.export = 'other'
+slotted_proxy.target = other_tree  # what __getattr__ returned depends on target, the cache is cleared
+assert slotted_proxy.export == 'otherTree'
+assert '_getattr_instance_cache' not in vars(CachedPineapple())  # no cache until __getattr__ needs one
+
+print("-"*20)
+
+
+# (4) profiling where each lookup is resolved
+# (1.2)-(1.5) are the stages of a lookup, the LookupProfiler counts, for every class and attribute, which stage
+# resolved it and how long the lookup took:
+# - 'data descriptor': found on the class (or a base) with __set__/__delete__, like tree_descriptor (a property)
+# - 'instance dict': found in obj.__dict__
+# - 'class attribute': found on the class or a base along the MRO, methods and other non-data descriptors included
+# - '__getattr__': __getattribute__ failed, the time includes the failed search and the __getattr__ call
+# - 'missing': __getattribute__ failed and there is no __getattr__
+# it replaces __getattribute__ (and __getattr__) of the attached classes with timing wrappers; the stage is decided
+# after the timed lookup, the same way as (1.2)-(1.4), so the classification is not part of the reported time.
+# attributes that are hot and resolved late (class attributes deep in the MRO, __getattr__) are the ones worth
+# slotting or caching, see (3) above and the descriptor chapter
+import contextlib
+import io
+import sys
+import time
+import types
+
+_LOOKUP_MISSING = object()
+
+
+def _lookup_stage(obj, name):
+    attr = _LOOKUP_MISSING
+    for klass in type(obj).__mro__:
+        if name in klass.__dict__:
+            attr = klass.__dict__[name]
+            break
+    if attr is not _LOOKUP_MISSING and (hasattr(type(attr), '__set__') or hasattr(type(attr), '__delete__')):
+        return 'data descriptor'
+    try:
+        instance_dict = object.__getattribute__(obj, '__dict__')
+    except AttributeError:
+        instance_dict = {}
+    if name in instance_dict:
+        return 'instance dict'
+    if attr is not _LOOKUP_MISSING:
+        return 'class attribute'
+    return '__getattr__'
+
+
+class LookupProfiler:
+    def __init__(self):
+        self.stats = {}  # (class name, attribute, stage) -> [count, seconds]
+        self._attached = {}  # class -> the names we set on it
+
+    def _record(self, cls, name, stage, seconds, count=1):
+        key = (cls.__qualname__, name, stage)
+        entry = self.stats.get(key)
+        if entry is None:
+            entry = self.stats[key] = [0, 0.0]
+        entry[0] += count
+        entry[1] += seconds
+
+    def attach(self, target):
+        if isinstance(target, types.ModuleType):
+            for value in list(vars(target).values()):
+                # type(value), isinstance() would look up __class__ on the instances of the classes attached so far
+                if issubclass(type(value), type) and value.__module__ == target.__name__ and value is not LookupProfiler:
+                    self.attach(value)
+            return target
+        cls = target
+        if cls in self._attached or getattr(cls.__getattribute__, '_lookup_profiler', None) is self:
+            return cls  # already profiled, directly or through a base
+        perf_counter = time.perf_counter
+        record = self._record
+        original_getattribute = cls.__getattribute__
+
+        def __getattribute__(obj, name):
+            start = perf_counter()
+            try:
+                value = original_getattribute(obj, name)
+            except AttributeError:
+                elapsed = perf_counter() - start
+                stage = '__getattr__' if hasattr(type(obj), '__getattr__') else 'missing'
+                record(type(obj), name, stage, elapsed)
+                raise
+            elapsed = perf_counter() - start
+            record(type(obj), name, _lookup_stage(obj, name), elapsed)
+            return value
+
+        __getattribute__._lookup_profiler = self
+        wrapped = {'__getattribute__': cls.__dict__.get('__getattribute__', _LOOKUP_MISSING)}
+        type.__setattr__(cls, '__getattribute__', __getattribute__)
+
+        original_getattr = getattr(cls, '__getattr__', None)
+        if original_getattr is not None and getattr(original_getattr, '_lookup_profiler', None) is not self:
+            def __getattr__(obj, name):
+                start = perf_counter()
+                try:
+                    return original_getattr(obj, name)
+                finally:
+                    record(type(obj), name, '__getattr__', perf_counter() - start, count=0)
+
+            __getattr__._lookup_profiler = self
+            wrapped['__getattr__'] = cls.__dict__.get('__getattr__', _LOOKUP_MISSING)
+            type.__setattr__(cls, '__getattr__', __getattr__)
+        self._attached[cls] = wrapped
+        return cls
+
+    def detach(self):
+        for cls, wrapped in self._attached.items():
+            for name, original in wrapped.items():
+                if original is _LOOKUP_MISSING:
+                    type.__delattr__(cls, name)
+                else:
+                    type.__setattr__(cls, name, original)
+        self._attached.clear()
+
+    def table(self, sort_by='total', limit=None):
+        columns = {'class': 0, 'attribute': 1, 'stage': 2, 'count': 3, 'total': 4, 'mean': 5}
+        rows = [
+            (cls_name, name, stage, count, seconds, seconds / count if count else 0.0)
+            for (cls_name, name, stage), (count, seconds) in self.stats.items()
+        ]
+        rows.sort(key=lambda row: row[columns[sort_by]], reverse=sort_by in ('count', 'total', 'mean'))
+        lines = [f'{"class":18} {"attribute":30} {"stage":16} {"count":>8} {"total us":>10} {"mean ns":>9}']
+        for cls_name, name, stage, count, seconds, mean in rows[:limit]:
+            lines.append(f'{cls_name:18} {name:30} {stage:16} {count:8} {seconds * 1e6:10.1f} {mean * 1e9:9.0f}')
+        return '\n'.join(lines)
+
+
+lookup_profiler = LookupProfiler()
+lookup_profiler.attach(Pineapple)
+profiled_pineapple = Pineapple()
+with contextlib.redirect_stdout(io.StringIO()):  # caught_by_attr prints "Inside Pineapple.__getattr__()" each time
+    for _ in range(1000):
+        profiled_pineapple.tree_descriptor
+        profiled_pineapple.pineapple_instance_variable
+        profiled_pineapple.pine_class_variable
+        profiled_pineapple.caught_by_attr
+lookup_profiler.detach()
+print(lookup_profiler.table(sort_by='mean'))
+"""
+class              attribute                      stage               count   total us   mean ns
+Pineapple          tree_descriptor                data descriptor      1000     1027.7      1028
+Pineapple          caught_by_attr                 __getattr__          1000      910.7       911
+Pineapple          pine_instance_variable         instance dict           1        0.6       649
+Pineapple          apple_instance_variable        instance dict           1        0.3       272
+Pineapple          pine_class_variable            class attribute      1000      160.7       161
+Pineapple          pineapple_instance_variable    instance dict        1001      137.5       137
+Pineapple          tree_value                     instance dict        1000      120.1       120
+"""
+# (the time of caught_by_attr includes its print, to the StringIO here)
+assert '__getattribute__' not in Pineapple.__dict__ and Pineapple.__getattr__ is Pineapple.__dict__['__getattr__']
+
+# a whole module can be profiled at once, every class defined in it is attached
+lookup_profiler = LookupProfiler()
+lookup_profiler.attach(sys.modules[__name__])
+Tree().export
+Apple().apple_class_variable
+lookup_profiler.detach()
+print(lookup_profiler.table(sort_by='attribute'))
+"""
+class              attribute                      stage               count   total us   mean ns
+Apple              apple_class_variable           class attribute         1        0.5       508
+Tree               export                         data descriptor         1        3.8      3848
+Tree               tree_value                     instance dict           1        0.4       443
+"""
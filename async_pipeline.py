@@ -0,0 +1,310 @@
+import asyncio
+import contextlib
+import inspect
+import time
+
+# The delegating generators of the "yield_clause" chapter pass values through a chain of generators,
+# one value at a time, in one thread: while a stage waits (for a socket, a disk, a sleep), the whole chain waits.
+# With asyncio, every stage can run as its own task, and a stage that waits lets the others run.
+# The stages are linked by asyncio.Queue objects:
+# - the queues are bounded (maxsize), a producer that is faster than its consumer waits in "await queue.put()",
+#   so the memory used by items in flight is bounded however fast the source is (backpressure)
+# - a stage may run several workers (concurrency=n) that take items from the same input queue,
+#   that is the concurrency limit of the stage (the output order is then not the input order any more)
+# - a failing stage cancels the whole pipeline and its exception is raised to the consumer,
+#   and a consumer that stops early (break, or the consumer task is cancelled) cancels every stage
+# - every stage counts items in/out, the time spent in the stage function, and the latency per item
+
+# (1) the pipeline
+_DONE = object()  # end-of-stream marker that travels through the queues
+
+
+class StageStats:
+    __slots__ = ('name', 'items_in', 'items_out', 'busy_seconds', 'max_latency', 'started', 'finished')
+
+    def __init__(self, name):
+        self.name = name
+        self.items_in = self.items_out = 0
+        self.busy_seconds = self.max_latency = 0.0
+        self.started = time.perf_counter()
+        self.finished = None  # set when the last worker of the stage has seen the end of the stream
+
+    @property
+    def mean_latency(self):
+        return self.busy_seconds / self.items_in if self.items_in else 0.0
+
+    @property
+    def throughput(self):
+        end = time.perf_counter() if self.finished is None else self.finished
+        return self.items_out / (end - self.started)
+
+    def __repr__(self):
+        return (f'{self.name}: in={self.items_in} out={self.items_out} '
+                f'throughput={self.throughput:.0f}/s mean_latency={self.mean_latency * 1e6:.0f}us '
+                f'max_latency={self.max_latency * 1e6:.0f}us')
+
+
+class AsyncPipeline:
+    def __init__(self, source, maxsize=64):
+        # source: an iterable or an async iterable
+        self.source = source
+        self.maxsize = maxsize
+        self.stages = []
+        self.stats = []
+
+    def stage(self, func, concurrency=1, maxsize=None, name=None):
+        """
+        Add a stage: func(item) is an async generator function (0, 1 or more outputs per item),
+        or a coroutine function (exactly one output per item).
+        """
+        self.stages.append((func, concurrency, maxsize or self.maxsize, name or func.__name__))
+        return self
+
+    async def _feed(self, queue):
+        if hasattr(self.source, '__aiter__'):
+            async for item in self.source:
+                await queue.put(item)
+        else:
+            for item in self.source:
+                await queue.put(item)
+        await queue.put(_DONE)
+
+    @staticmethod
+    async def _work(func, stats, in_queue, out_queue, remaining_workers):
+        is_async_gen = inspect.isasyncgenfunction(func)
+        perf_counter = time.perf_counter
+        while True:
+            item = await in_queue.get()
+            if item is _DONE:
+                await in_queue.put(_DONE)  # let the other workers of this stage see it too
+                remaining_workers[0] -= 1
+                if remaining_workers[0] == 0:  # the last worker of the stage ends the next stage
+                    stats.finished = perf_counter()
+                    await out_queue.put(_DONE)
+                return
+            stats.items_in += 1
+            start = perf_counter()
+            if is_async_gen:
+                # the time spent waiting in out_queue.put() (backpressure) is not counted as work
+                busy = 0.0
+                async for result in func(item):
+                    busy += perf_counter() - start
+                    await out_queue.put(result)
+                    stats.items_out += 1
+                    start = perf_counter()
+                busy += perf_counter() - start
+            else:
+                result = await func(item)
+                busy = perf_counter() - start
+                await out_queue.put(result)
+                stats.items_out += 1
+            stats.busy_seconds += busy
+            stats.max_latency = max(stats.max_latency, busy)
+
+    async def __aiter__(self):
+        queues = [asyncio.Queue(self.maxsize)] + [asyncio.Queue(maxsize) for _, _, maxsize, _ in self.stages]
+        failed = asyncio.get_running_loop().create_future()
+        self.stats = [StageStats(name) for _, _, _, name in self.stages]
+
+        def on_done(task):
+            if not task.cancelled() and task.exception() is not None and not failed.done():
+                failed.set_exception(task.exception())
+
+        tasks = [asyncio.create_task(self._feed(queues[0]))]
+        for i, (func, concurrency, _, _) in enumerate(self.stages):
+            remaining_workers = [concurrency]  # shared by the workers of the stage
+            for _ in range(concurrency):
+                tasks.append(asyncio.create_task(
+                    self._work(func, self.stats[i], queues[i], queues[i + 1], remaining_workers)
+                ))
+        for task in tasks:
+            task.add_done_callback(on_done)
+
+        output = queues[-1]
+        try:
+            while True:
+                if failed.done():
+                    failed.result()  # raises the exception of the failed stage
+                try:
+                    item = output.get_nowait()
+                except asyncio.QueueEmpty:
+                    getter = asyncio.ensure_future(output.get())
+                    await asyncio.wait((getter, failed), return_when=asyncio.FIRST_COMPLETED)
+                    if not getter.done():
+                        getter.cancel()
+                        failed.result()
+                    item = getter.result()
+                if item is _DONE:
+                    return
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if failed.done() and not failed.cancelled():
+                failed.exception()  # retrieved, so asyncio does not log "exception was never retrieved"
+
+
+# (2) an example: the same three stages, as delegating generators and as an async pipeline
+def even_filter_gen(source):
+    for x in source:
+        if not x % 2:
+            yield x
+
+
+def square_gen(source):
+    for x in source:
+        yield x * x
+
+
+def pair_gen(source):
+    for x in source:
+        yield x
+        yield -x
+
+
+async def even_filter(x):
+    if not x % 2:
+        yield x
+
+
+async def square(x):
+    return x * x
+
+
+async def pair(x):
+    yield x
+    yield -x
+
+
+async def collect(pipeline):
+    return [item async for item in pipeline]
+
+
+def make_pipeline(source, concurrency=1, maxsize=64):
+    return (AsyncPipeline(source, maxsize)
+            .stage(even_filter, concurrency)
+            .stage(square, concurrency)
+            .stage(pair, concurrency))
+
+
+n = 10
+assert asyncio.run(collect(make_pipeline(range(n)))) == list(pair_gen(square_gen(even_filter_gen(range(n)))))
+
+
+# (3) backpressure: a fast producer is held back by a slow consumer
+async def backpressure_demo():
+    produced = 0
+
+    def counting_source():
+        nonlocal produced
+        for i in range(1_000):
+            produced += 1
+            yield i
+
+    pipeline = make_pipeline(counting_source(), maxsize=4)
+    max_ahead = 0
+    consumed = 0
+    async for _ in pipeline:
+        consumed += 1
+        await asyncio.sleep(0)  # a consumer slower than the stages
+        max_ahead = max(max_ahead, produced - consumed)  # one output per input on average (half are even, x2)
+    return max_ahead
+
+
+max_ahead = asyncio.run(backpressure_demo())
+print(f'the source was never more than {max_ahead} items ahead of the consumer')
+"""
+the source was never more than 27 items ahead of the consumer
+"""
+assert max_ahead < 50  # 4 queues of at most 4 items, plus what the stages hold
+
+
+# (4) errors reach the consumer, and stop every stage
+async def failing_square(x):
+    if x == 6:
+        raise ValueError(f'cannot square {x}')
+    return x * x
+
+
+async def error_demo():
+    pipeline = AsyncPipeline(range(1_000_000), maxsize=8).stage(even_filter).stage(failing_square, concurrency=4)
+    received = []
+    try:
+        async for item in pipeline:
+            received.append(item)
+    except ValueError as e:
+        print(f'{e!r} after {len(received)} items')
+        """
+        ValueError('cannot square 6') after 1 items
+        """
+    assert len(asyncio.all_tasks()) == 1  # only this task is left, the stages are cancelled
+
+
+asyncio.run(error_demo())
+
+
+# (5) cancellation: the consumer stops early
+# "break" leaves the async generator suspended, asyncio closes it later, when it is garbage collected;
+# contextlib.aclosing() closes it right away, which cancels the stage tasks before the "async with" ends
+async def cancellation_demo():
+    async with contextlib.aclosing(aiter(make_pipeline(range(1_000_000), concurrency=2))) as items:
+        async for item in items:
+            if item > 100:
+                break
+    assert len(asyncio.all_tasks()) == 1
+
+
+asyncio.run(cancellation_demo())
+
+
+# (6) benchmark: the synchronous generator chain against the async pipeline
+N = 100_000
+start = time.perf_counter()
+sync_result = list(pair_gen(square_gen(even_filter_gen(range(N)))))
+sync_seconds = time.perf_counter() - start
+pipeline = make_pipeline(range(N))
+start = time.perf_counter()
+async_result = asyncio.run(collect(pipeline))
+async_seconds = time.perf_counter() - start
+assert async_result == sync_result
+print(f'CPU-only stages, {N} items: generators {sync_seconds * 1e3:.0f} ms, async pipeline {async_seconds * 1e3:.0f} ms')
+for stats in pipeline.stats:
+    print(stats)
+throughputs = [stats.throughput for stats in pipeline.stats]
+time.sleep(0.01)
+assert [stats.throughput for stats in pipeline.stats] == throughputs  # a finished stage keeps its throughput
+
+# when the stages wait (here a 1 ms sleep per item, e.g. a request), the generators wait one item at a time,
+# while the pipeline keeps up to "concurrency" items waiting at the same time in each stage
+M = 200
+
+
+def slow_square_gen(source):
+    for x in source:
+        time.sleep(0.001)
+        yield x * x
+
+
+async def slow_square(x):
+    await asyncio.sleep(0.001)
+    return x * x
+
+
+start = time.perf_counter()
+sync_result = list(slow_square_gen(even_filter_gen(range(M))))
+sync_seconds = time.perf_counter() - start
+start = time.perf_counter()
+async_result = asyncio.run(collect(AsyncPipeline(range(M)).stage(even_filter).stage(slow_square, concurrency=50)))
+async_seconds = time.perf_counter() - start
+assert sorted(async_result) == sync_result
+print(f'waiting stages, {M} items: generators {sync_seconds * 1e3:.0f} ms, async pipeline {async_seconds * 1e3:.0f} ms')
+"""
+CPU-only stages, 100000 items: generators 10 ms, async pipeline 534 ms
+even_filter: in=100000 out=50000 throughput=93545/s mean_latency=1us max_latency=45us
+square: in=50000 out=50000 throughput=93543/s mean_latency=0us max_latency=249us
+pair: in=50000 out=100000 throughput=187085/s mean_latency=1us max_latency=173us
+waiting stages, 200 items: generators 113 ms, async pipeline 6 ms
+"""
+# each item costs a few queue operations and task switches per stage, so for CPU-only stages the plain
+# generator chain is much faster; the pipeline pays off when the stages wait, and the waits can overlap
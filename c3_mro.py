@@ -118,3 +118,526 @@ try:
     """
 except TypeError as e:
     print(e)
+
+
+# ----APPENDIX: a standalone C3 linearization engine----------------------
+# __mro__ is computed by CPython when the class object is built, so it can only tell the order of classes that
+# already exist. When class hierarchies are generated at runtime, we may want to compute (and check) the order
+# before any type() call is made, from a plain graph such as {'L2A': ['L1A', 'L1B'], ...}
+# the engine below follows the same MRO(cls) = [cls] + merge(...) formula, with two changes for large hierarchies:
+# - the MRO of every base is memoized, so a shared base is linearized only once
+# - merge() keeps a head index per list and a counter of how many times each node appears in a tail,
+#   "is this head in any tail?" becomes one dict lookup instead of a scan of every other list
+import time
+import weakref
+from collections import Counter
+from collections.abc import Mapping
+
+
+class C3ConflictError(TypeError):
+    """Raised when merge() gets stuck, it keeps the heads that block each other."""
+
+    def __init__(self, node, heads):
+        self.node = node
+        self.heads = heads
+        super().__init__(
+            f'Cannot create a consistent method resolution order (MRO) for {_c3_name(node)}: '
+            f'conflicting heads {[_c3_name(head) for head in heads]}'
+        )
+
+
+def _c3_name(node):
+    return getattr(node, '__name__', node)
+
+
+def c3_merge(node, sequences):
+    heads = [0] * len(sequences)
+    in_tail = Counter()
+    for seq in sequences:
+        in_tail.update(seq[1:])
+    result = []
+    while True:
+        candidate = None
+        for seq, head in zip(sequences, heads):
+            if head < len(seq) and not in_tail[seq[head]]:
+                candidate = seq[head]
+                break
+        if candidate is None:
+            blocked = [seq[head] for seq, head in zip(sequences, heads) if head < len(seq)]
+            if not blocked:
+                return result
+            raise C3ConflictError(node, list(dict.fromkeys(blocked)))
+        result.append(candidate)
+        # the candidate is in no tail, so it can only be a head: pop it everywhere and promote the next heads
+        for i, seq in enumerate(sequences):
+            head = heads[i]
+            if head < len(seq) and seq[head] == candidate:
+                heads[i] = head = head + 1
+                if head < len(seq):
+                    in_tail[seq[head]] -= 1
+
+
+class _C3ClassCache:
+    # the linearizations of classes, kept only while the class lives: the value of a class in the weak dict is
+    # its linearization WITHOUT the class itself, a value that referenced its own key would keep it alive forever
+    def __init__(self):
+        self._tails = weakref.WeakKeyDictionary()
+
+    def __contains__(self, cls):
+        return cls in self._tails
+
+    def __getitem__(self, cls):
+        return [cls, *self._tails[cls]]
+
+    def __setitem__(self, cls, linearization):
+        self._tails[cls] = tuple(linearization[1:])
+
+
+_c3_class_cache = _C3ClassCache()
+
+
+def c3_linearize(cls_or_graph, memo=None):
+    """
+    Return the C3 linearization of a class (a list of classes, the same as list(cls.__mro__)),
+    or of every node of a graph given as a mapping {node: [bases]} (a dict {node: [nodes]}).
+    The bases of a class are read from __bases__, __mro__ is never used.
+    """
+    if isinstance(cls_or_graph, Mapping):
+        graph = cls_or_graph
+        memo = {} if memo is None else memo
+        for node in graph:
+            _c3_linearize_node(node, graph.__getitem__, memo)
+        return memo
+    memo = _c3_class_cache if memo is None else memo
+    return _c3_linearize_node(cls_or_graph, lambda cls: cls.__bases__, memo)
+
+
+def _c3_linearize_node(root, get_bases, memo):
+    if root in memo:
+        return memo[root]
+    # an explicit stack instead of recursion, generated hierarchies can be deeper than the recursion limit
+    stack = [root]
+    expanded = set()
+    while stack:
+        node = stack[-1]
+        if node in memo:
+            stack.pop()
+            continue
+        bases = get_bases(node)
+        missing = [base for base in bases if base not in memo]
+        if missing:
+            # a base that is expanded but not finished yet can only be one of our own descendants
+            if node in expanded or any(base in expanded for base in missing):
+                raise TypeError(f'Inheritance cycle detected at {_c3_name(node)}')
+            expanded.add(node)
+            stack.extend(reversed(missing))
+            continue
+        stack.pop()
+        expanded.discard(node)
+        if not bases:
+            memo[node] = [node]
+        else:
+            memo[node] = [node] + c3_merge(node, [memo[base] for base in bases] + [list(bases)])
+    return memo[root]
+
+
+# the engine gives the same result as CPython
+assert c3_linearize(L4) == list(L4.__mro__)
+for cls in L4.__bases__:
+    assert c3_linearize(cls) == list(cls.__mro__)
+
+# the cache does not keep the classes alive
+import gc
+
+temporary_class = type('Temporary', (L4,), {})
+assert c3_linearize(temporary_class) == list(temporary_class.__mro__)
+temporary_ref = weakref.ref(temporary_class)
+del temporary_class
+gc.collect()
+assert temporary_ref() is None
+
+# the same diamond as a plain graph, no class object is needed
+diamond_graph = {
+    'L1A': ['object'], 'L1B': ['object'], 'L1C': ['object'], 'object': [],
+    'L2A': ['L1A', 'L1B'], 'L2B': ['L1B', 'L1C'], 'L2C': ['L1B', 'L1C'],
+    'L3A': ['L1A', 'L2C', 'L1B'], 'L3B': ['L1A', 'L2B', 'L1C'],
+    'L4': ['L3A', 'L3B', 'L2A'],
+}
+assert c3_linearize(diamond_graph)['L4'] == [x.__name__ for x in L4.__mro__]
+
+# and the E1(L2C, L3A) case reports which heads block each other
+try:
+    c3_linearize(dict(diamond_graph, E1=['L2C', 'L3A']))
+except C3ConflictError as e:
+    print(e)
+    assert e.node == 'E1' and e.heads == ['L2C', 'L3A']
+"""
+Cannot create a consistent method resolution order (MRO) for E1: conflicting heads ['L2C', 'L3A']
+"""
+print("-"*20)
+
+
+# benchmark: scale the L1*-L4 diamond up, the L1* classes of block k inherit from the L4 of block k-1,
+# so every block depends on (and reuses the memoized MRO of) the previous one
+def diamond_blocks_graph(n_blocks, width=1):
+    graph = {'object': []}
+    previous = ['object']
+    for k in range(n_blocks):
+        def name(level):
+            return f'{level}_{k}'
+        graph.update({
+            name('L1A'): list(previous), name('L1B'): list(previous), name('L1C'): list(previous),
+            name('L2A'): [name('L1A'), name('L1B')],
+            name('L2B'): [name('L1B'), name('L1C')],
+            name('L2C'): [name('L1B'), name('L1C')],
+            name('L3A'): [name('L1A'), name('L2C'), name('L1B')],
+            name('L3B'): [name('L1A'), name('L2B'), name('L1C')],
+            name('L4'): [name('L3A'), name('L3B'), name('L2A')],
+        })
+        # start from "object" again every "width" blocks, otherwise the MRO lengths grow without limit
+        previous = [name('L4')] if (k + 1) % width else ['object']
+    return graph
+
+
+def build_classes_with_type(graph):
+    classes = {'object': object}
+    for node, bases in graph.items():
+        if node != 'object':
+            classes[node] = type(node, tuple(classes[base] for base in bases), {})
+    return classes
+
+
+for n_classes in [1_000, 10_000]:
+    blocks_graph = diamond_blocks_graph(n_classes // 9, width=10)
+
+    start = time.perf_counter()
+    linearized = c3_linearize(blocks_graph)
+    c3_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    built_classes = build_classes_with_type(blocks_graph)
+    type_seconds = time.perf_counter() - start
+
+    assert all([cls.__name__ for cls in built_classes[node].__mro__] == linearized[node] for node in blocks_graph)
+    print(f'{len(blocks_graph)} classes: c3_linearize {c3_seconds * 1e3:.1f} ms, type() {type_seconds * 1e3:.1f} ms')
+"""
+1000 classes: c3_linearize 75.3 ms, type() 81.6 ms
+10000 classes: c3_linearize 877.5 ms, type() 844.9 ms
+"""
+# the pure Python engine keeps up with type() (which runs the C version of the same algorithm and also builds the
+# class objects), so the order of a generated hierarchy can be checked up front for about the cost of creating it
+print("-"*20)
+
+
+# ----APPENDIX: flattened dispatch---------------------------------------
+# every attribute lookup on an instance of L4 walks L4.__mro__ until a class __dict__ has the name
+# (CPython has a per-type attribute cache, but it is global, bounded, and invalidated by any class modification)
+# @flatten_mro resolves every inherited attribute once, in C3 order, and copies it into the __dict__ of the class,
+# so the first dict in the walk already has the answer.
+# the copies go stale when a base is monkey-patched (Base.method = new_method), to notice this the bases must use
+# the MROWatcher metaclass: its __setattr__ / __delattr__ re-resolve the changed name in every flattened subclass.
+# attributes of plain bases (object, builtins, classes without MROWatcher) are not copied and keep the normal lookup
+_flattened_dependents = weakref.WeakKeyDictionary()  # watched base -> flattened subclasses
+
+
+class MROWatcher(type):
+    def __setattr__(cls, name, value):
+        super().__setattr__(name, value)
+        if not _is_dunder(name):
+            cls.__dict__.get('__flattened__', set()).discard(name)  # it is an own attribute now, not a copy
+            _refresh_flattened(cls, name)
+
+    def __delattr__(cls, name):
+        super().__delattr__(name)
+        if not _is_dunder(name):
+            _refresh_flattened(cls, name)
+
+
+def _is_dunder(name):
+    return name.startswith('__') and name.endswith('__')
+
+
+def _resolve_flattened(cls, name):
+    # the same walk as the normal lookup, but the copies made by flatten_mro are skipped,
+    # so the result never depends on the order in which the flattened classes are refreshed
+    for klass in cls.__mro__[1:]:
+        if name in klass.__dict__ and name not in klass.__dict__.get('__flattened__', ()):
+            return True, klass.__dict__[name]
+    return False, None
+
+
+def _flatten_name(cls, name):
+    copied = cls.__dict__['__flattened__']
+    if name in cls.__dict__ and name not in copied:
+        return  # defined (or patched) on the class itself, it wins over any base
+    found, value = _resolve_flattened(cls, name)
+    if found:
+        type.__setattr__(cls, name, value)
+        copied.add(name)
+    elif name in copied:
+        type.__delattr__(cls, name)
+        copied.discard(name)
+
+
+def _refresh_flattened(cls, name):
+    for dependent in list(_flattened_dependents.get(cls, ())):
+        _flatten_name(dependent, name)
+
+
+def flatten_mro(cls):
+    # a change to a plain class cannot be seen, its copies would go stale and break the C3 order:
+    # every class of the MRO (object excepted) must be watched
+    plain = [klass.__name__ for klass in cls.__mro__ if klass is not object and not isinstance(klass, MROWatcher)]
+    if plain:
+        raise TypeError(f'{cls.__name__} cannot be flattened, {", ".join(plain)} not using the MROWatcher metaclass')
+    type.__setattr__(cls, '__flattened__', set())
+    for klass in cls.__mro__[1:-1]:
+        _flattened_dependents.setdefault(klass, weakref.WeakSet()).add(cls)
+    names = {name for klass in cls.__mro__[1:-1] for name in klass.__dict__}
+    for name in names:
+        if not _is_dunder(name):
+            _flatten_name(cls, name)
+    return cls
+
+
+# the L1*-L4 diamond again, now with watched bases
+class W1A(metaclass=MROWatcher):
+    def who(self): return 'W1A'
+class W1B(metaclass=MROWatcher):
+    def who(self): return 'W1B'
+    def only_in_w1b(self): return 'W1B'
+class W1C(metaclass=MROWatcher): pass
+class W2A(W1A, W1B): pass
+class W2B(W1B, W1C): pass
+class W2C(W1B, W1C):
+    def who(self): return 'W2C'
+class W3A(W1A, W2C, W1B): pass
+class W3B(W1A, W2B, W1C): pass
+@flatten_mro
+class W4(W3A, W3B, W2A): pass
+
+
+# the copies follow the C3 order: W1A comes before W2C in the MRO of W4
+assert W4.__dict__['who'] is W1A.__dict__['who'] and W4().who() == 'W1A'
+assert W4.__dict__['only_in_w1b'] is W1B.__dict__['only_in_w1b']
+assert W4.__flattened__ == {'who', 'only_in_w1b'}
+
+# monkey-patching a base updates the copies, deleting from a base falls back to the next class in the MRO
+W1A.who = lambda self: 'patched W1A'
+assert W4().who() == 'patched W1A'
+del W1A.who
+assert W4().who() == 'W2C'
+del W1B.only_in_w1b
+assert 'only_in_w1b' not in W4.__dict__ and not hasattr(W4(), 'only_in_w1b')
+# a name defined on the flattened class itself is never overwritten
+W4.who = lambda self: 'W4'
+W2C.who = lambda self: 'patched W2C'
+assert W4().who() == 'W4'
+
+
+# a plain (unwatched) class in the MRO is refused: a name added to it later could not update the copies
+class Plain:
+    def who(self): return 'Plain'
+class Y(Plain, W1A): pass
+
+
+try:
+    flatten_mro(Y)
+except TypeError as e:
+    print(e)
+"""
+Y cannot be flattened, Plain not using the MROWatcher metaclass
+"""
+assert Y().who() == 'Plain' and '__flattened__' not in Y.__dict__
+
+
+# benchmark: method-call latency against MRO depth, the method is defined on the root of a single-inheritance chain
+import timeit
+
+
+def watched_chain(depth, flatten):
+    cls = MROWatcher('Root', (), {'method': lambda self: None})
+    for level in range(depth - 1):
+        cls = MROWatcher(f'Level{level}', (cls,), {})
+    return flatten_mro(cls) if flatten else cls
+
+
+# "warm" is the steady state, the specializing interpreter (3.11+) caches the lookup result per call site;
+# "cold" modifies the leaf class before each call, which invalidates those caches and forces the MRO walk
+# (the same thing happens in code that keeps patching or creating classes)
+for depth in [2, 8, 32, 128]:
+    timings = []
+    for stmt in ['obj.method()', 'set_attr(cls, "tick", 0); obj.method()']:
+        for flatten in [False, True]:
+            cls = watched_chain(depth, flatten)
+            timer = timeit.Timer(stmt, globals={'obj': cls(), 'cls': cls, 'set_attr': type.__setattr__})
+            timings.append(min(timer.repeat(number=100_000, repeat=5)) / 100_000 * 1e9)
+    print(f'MRO depth {depth:4}: warm plain {timings[0]:5.1f} ns, flattened {timings[1]:5.1f} ns | '
+          f'cold plain {timings[2]:6.1f} ns, flattened {timings[3]:6.1f} ns')
+"""
+MRO depth    2: warm plain  56.4 ns, flattened  55.4 ns | cold plain  448.8 ns, flattened  403.3 ns
+MRO depth    8: warm plain  53.0 ns, flattened  49.2 ns | cold plain  502.6 ns, flattened  404.6 ns
+MRO depth   32: warm plain  55.8 ns, flattened  56.3 ns | cold plain  881.3 ns, flattened  398.6 ns
+MRO depth  128: warm plain  55.0 ns, flattened  56.1 ns | cold plain 2311.5 ns, flattened  393.6 ns
+"""
+# with warm caches the depth does not matter, with cold caches the plain lookup grows with the depth of the MRO
+# while the flattened one stays flat
+print("-"*20)
+
+
+# ----APPENDIX: multiple dispatch on the C3 order------------------------
+# functools.singledispatch picks the implementation from the type of the first argument only,
+# multidispatch picks it from the types of several arguments:
+# - an implementation registered for (T1, T2, ...) applies when every argument is an instance of its T
+# - among the applicable ones, A is more specific than B when each T of A comes no later than the T of B
+#   in the C3 linearization of the argument type; if no single most specific one exists, the call is ambiguous
+# - the choice is cached per tuple of concrete argument types, a repeated call costs one dict lookup,
+#   and the cache is cleared whenever a new implementation is registered
+from collections.abc import Iterable, Sized
+from functools import update_wrapper
+
+
+class MultiDispatcher:
+    def __init__(self, default):
+        self.default = default
+        self.registry = {}
+        self.dispatch_cache = {}
+        self.nargs = None
+        update_wrapper(self, default)
+
+    def register(self, *types):
+        if self.nargs is None:
+            self.nargs = len(types)
+        elif len(types) != self.nargs:
+            raise TypeError(f'{self.__name__} dispatches on {self.nargs} arguments, got {len(types)} types')
+
+        def decorator(func):
+            self.registry[types] = func
+            self.dispatch_cache.clear()
+            return func
+
+        return decorator
+
+    def __call__(self, *args, **kwargs):
+        key = tuple(map(type, args[:self.nargs]))
+        try:
+            func = self.dispatch_cache[key]
+        except KeyError:
+            func = self.dispatch_cache[key] = self.resolve(key)
+        return func(*args, **kwargs)
+
+    def resolve(self, arg_types):
+        if len(arg_types) != self.nargs:
+            return self.default
+        applicable = [
+            types for types in self.registry
+            if all(issubclass(arg_type, t) for arg_type, t in zip(arg_types, types))
+        ]
+        if not applicable:
+            return self.default
+        orders = [{cls: i for i, cls in enumerate(c3_linearize(arg_type))} for arg_type in arg_types]
+        # virtual subclasses (ABC.register) are not in the linearization, they rank after every real base
+        ranks = {types: [order.get(t, len(order)) for order, t in zip(orders, types)] for types in applicable}
+        # a signature is dominated by one that is at least as close on every argument, and closer on one;
+        # equal ranks (e.g. two virtual ABCs) are a tie, neither of them wins
+        best = [
+            types for types in applicable
+            if not any(ranks[other] != ranks[types] and all(o <= r for o, r in zip(ranks[other], ranks[types]))
+                       for other in applicable)
+        ]
+        if len(best) != 1:
+            raise TypeError(
+                f'Ambiguous dispatch of {self.__name__} for {[t.__name__ for t in arg_types]}: '
+                f'{[[t.__name__ for t in types] for types in best or applicable]}'
+            )
+        return self.registry[best[0]]
+
+
+def multidispatch(func):
+    return MultiDispatcher(func)
+
+
+@multidispatch
+def meet(a, b):
+    return 'default'
+
+
+@meet.register(L1A, L1B)
+def _(a, b):
+    return 'L1A-L1B'
+
+
+@meet.register(L2A, L1B)
+def _(a, b):
+    return 'L2A-L1B'
+
+
+@meet.register(L1A, L2C)
+def _(a, b):
+    return 'L1A-L2C'
+
+
+assert meet(L1A(), L1B()) == 'L1A-L1B'
+assert meet(L2A(), L1B()) == 'L2A-L1B'      # L2A is closer to L2A than L1A is
+assert meet(L3A(), L3A()) == 'L1A-L2C'      # MRO(L3A) = L3A, L1A, L2C, L1B, ...
+assert meet(L1B(), L1B()) == 'default'
+assert meet(1, 2) == 'default'
+try:
+    meet(L2A(), L2C())  # (L2A, L1B) is better on the first argument, (L1A, L2C) on the second
+except TypeError as e:
+    print(e)
+"""
+Ambiguous dispatch of meet for ['L2A', 'L2C']: [['L2A', 'L1B'], ['L1A', 'L2C']]
+"""
+
+
+# registering a new implementation invalidates the cached choices
+@meet.register(L2A, L2C)
+def _(a, b):
+    return 'L2A-L2C'
+
+
+assert meet(L2A(), L2C()) == 'L2A-L2C'
+assert meet(L4(), L4()) == 'L2A-L2C'
+
+
+
+# two virtual ABCs that list is registered with rank the same (after every real base): that is an ambiguity too
+@multidispatch
+def describe(container, n):
+    return 'default'
+
+
+@describe.register(Sized, int)
+def _(container, n):
+    return 'Sized'
+
+
+@describe.register(Iterable, int)
+def _(container, n):
+    return 'Iterable'
+
+
+try:
+    describe([], 1)
+except TypeError as e:
+    assert str(e).startswith("Ambiguous dispatch of describe for ['list', 'int']")
+else:
+    raise AssertionError('describe([], 1) was not ambiguous')
+
+
+# benchmark: route heterogeneous records through the dispatcher in a hot loop
+records = [(L4(), L3A()), (L2A(), L1B()), (L3A(), L3A()), (L1A(), L1B())] * 25_000
+start = time.perf_counter()
+for a, b in records:
+    meet(a, b)
+cached_seconds = time.perf_counter() - start
+start = time.perf_counter()
+for a, b in records[:10_000]:
+    meet.resolve((type(a), type(b)))(a, b)
+uncached_seconds = time.perf_counter() - start
+print(f'cached dispatch {cached_seconds / len(records) * 1e9:.0f} ns/call, '
+      f'resolving every call {uncached_seconds / 10_000 * 1e9:.0f} ns/call')
+"""
+cached dispatch 944 ns/call, resolving every call 19916 ns/call
+"""
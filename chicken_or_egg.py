@@ -117,3 +117,168 @@ print(f'{isinstance(object, object), isinstance(type, type)=}')
 # (manufacture class objects and giving them class names)
 # "object" is a class, the base of every class, it has type "type",
 # and any class bases on it has type "type" to specify that this is a class
+
+
+# (4) A census of the heap
+# print_object_info answers "what is this object" for one object; asking the same question (mostly type(obj))
+# for every object of the process gives a per-type histogram of the heap, a quick way to find what is leaking.
+# the census keeps a histogram per type, not the objects:
+# - the default source is the garbage collector, generation by generation. That does NOT avoid the list of every
+#   object: Python offers no way to stream over the gc objects, gc.get_objects(generation) returns a list, and in a
+#   long-running process almost everything is in the oldest generation, so gc.get_objects(2) is a list of nearly
+#   every container anyway (8 bytes per object, e.g. 80 MB for 10M objects). The gc sees every container (instances,
+#   dicts, lists, ...); atoms (str, int, float, bytes, ...) are not tracked by the gc, they are reached through
+#   gc.get_referents()
+# - with a root, it walks the objects reachable from the root instead, with a stack and a set of the ids seen
+# - shallow bytes is sys.getsizeof(obj); retained bytes is an approximation: the shallow size plus the untracked
+#   objects the object is the first to reach (atoms, code objects, static types, and whatever they reach in turn;
+#   each is charged once, to its first tracked referrer, shared ones are not split). An untracked object retains at
+#   least itself, so retained >= shallow for every type. A precise retained size needs a dominator tree, which is
+#   far too slow for millions of objects.
+#   To charge each untracked object once, the census keeps the ids of all those met so far: that set grows with
+#   their number (some 60 bytes each), it is the other memory cost of the census
+# - two censuses can be diffed to find the types whose counts keep growing
+import gc
+import sys
+import time
+import types
+
+
+def _iter_gc_objects():
+    for generation in range(3):
+        yield from gc.get_objects(generation)
+
+
+def _iter_reachable(root):
+    # classes and modules are shared by everything, the walk does not go into them (or it would reach everything)
+    seen = {id(root)}
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        yield obj
+        for referent in _referents(obj):
+            if id(referent) not in seen and not isinstance(referent, (type, types.ModuleType)):
+                seen.add(id(referent))
+                stack.append(referent)
+
+
+def _referents(obj):
+    # code objects have no tp_traverse (they are not tracked), gc.get_referents() sees nothing in them
+    if type(obj) is types.CodeType:
+        return [getattr(obj, name) for name in _CODE_PARTS if hasattr(obj, name)]
+    return gc.get_referents(obj)
+
+
+_CODE_PARTS = ('co_code', 'co_consts', 'co_names', 'co_varnames', 'co_freevars', 'co_cellvars', 'co_filename',
+               'co_name', 'co_qualname', 'co_linetable', 'co_exceptiontable')
+
+
+def heap_census(root=None):
+    """Return {type name: [count, shallow bytes, retained bytes]} of the gc objects, or of the objects under root."""
+    entries = {}  # type -> [count, shallow, retained], the names are only made once at the end
+    getsizeof = sys.getsizeof
+    is_tracked = gc.is_tracked
+    charged = set()  # ids of the untracked objects already charged to a referrer
+    from_gc = root is None
+
+    for obj in (_iter_gc_objects() if from_gc else _iter_reachable(root)):
+        size = getsizeof(obj)
+        entry = entries.get(type(obj))
+        if entry is None:
+            entry = entries[type(obj)] = [0, 0, 0]
+        entry[0] += 1
+        entry[1] += size
+        if not is_tracked(obj):
+            if id(obj) in charged:
+                entry[2] += size  # (under a root) already in the retained bytes of its referrer, it retains itself
+                continue
+            charged.add(id(obj))
+        # untracked objects (atoms, code objects, static types, tuples/dicts of atoms that the gc untracks, ...)
+        # are charged to the first tracked object that reaches them, through any chain of untracked objects
+        untracked = [referent for referent in _referents(obj) if not is_tracked(referent)]
+        while untracked:
+            referent = untracked.pop()
+            if id(referent) in charged:
+                continue
+            charged.add(id(referent))
+            referent_size = getsizeof(referent)
+            size += referent_size
+            if from_gc:  # they are not in gc.get_objects(), count them here (each one retains itself at least)
+                referent_entry = entries.get(type(referent))
+                if referent_entry is None:
+                    referent_entry = entries[type(referent)] = [0, 0, 0]
+                referent_entry[0] += 1
+                referent_entry[1] += referent_size
+                referent_entry[2] += referent_size
+            untracked.extend(child for child in _referents(referent) if not is_tracked(child))
+        entry[2] += size
+
+    census = {}
+    for obj_type, (count, shallow, retained) in entries.items():
+        entry = census.setdefault(f'{obj_type.__module__}.{obj_type.__qualname__}', [0, 0, 0])
+        entry[0] += count
+        entry[1] += shallow
+        entry[2] += retained
+    return census
+
+
+def census_diff(before, after):
+    """Rows (type name, count delta, shallow bytes delta, retained bytes delta), the largest growth first."""
+    rows = []
+    for name in before.keys() | after.keys():
+        old = before.get(name, (0, 0, 0))
+        new = after.get(name, (0, 0, 0))
+        delta = (new[0] - old[0], new[1] - old[1], new[2] - old[2])
+        if any(delta):
+            rows.append((name, *delta))
+    rows.sort(key=lambda row: (row[2], row[1]), reverse=True)
+    return rows
+
+
+def print_census(census, limit=10):
+    print(f'{"type":40} {"count":>10} {"shallow":>12} {"retained":>12}')
+    for name, (count, shallow, retained) in sorted(census.items(), key=lambda item: item[1][1], reverse=True)[:limit]:
+        print(f'{name:40} {count:10} {shallow:12} {retained:12}')
+
+
+start = time.perf_counter()
+census_before = heap_census()
+print(f'census of {sum(entry[0] for entry in census_before.values())} objects '
+      f'in {time.perf_counter() - start:.2f} s')
+print_census(census_before, limit=5)
+"""
+census of 14780 objects in 0.02 s
+type                                          count      shallow     retained
+builtins.str                                   3934       352486       352486
+builtins.bytes                                 1993       250857       250857
+builtins.dict                                   609       240680       392422
+builtins.code                                   648       229720       229720
+builtins.type                                   267       183976       186640
+"""
+assert all(retained >= shallow for _, shallow, retained in census_before.values())
+
+# a "leak": objects that keep being created and are never released
+leaked = [DictInherited() for _ in range(10_000)]
+for i, d in enumerate(leaked):
+    d['key'] = f'value {i}'
+census_after = heap_census()
+for row in census_diff(census_before, census_after)[:3]:
+    print(row)
+"""
+('__main__.DictInherited', 10000, 2080000, 2668890)
+('builtins.str', 9966, 587052, 587052)
+('builtins.list', 58, 90192, 90948)
+"""
+assert census_diff(census_before, census_after)[0][:2] == ('__main__.DictInherited', 10_000)
+
+# the same census for the objects reachable from one root only
+print_census(heap_census(root=leaked), limit=3)
+"""
+type                                          count      shallow     retained
+__main__.DictInherited                        10000      2080000      2668890
+builtins.str                                  10000       588890       588890
+builtins.list                                     1        85176        85176
+"""
+assert all(retained >= shallow for _, shallow, retained in heap_census(root=leaked).values())
+# the census costs about 1 us per object: 3M objects took 2.6 s here. 10M objects were not measured, at the same
+# rate (and with the memory for the lists and the id set) that would be around 9 s
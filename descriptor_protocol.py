@@ -144,3 +144,692 @@ print(Dividing.__dict__['result'])
 print(div_instance.result)
 div_instance = Dividing(5, 0)
 # the "result" = denominator/divider is not valid but there is no error raised since the evaluation is lazy
+print("-"*20)
+
+
+# (5) per-instance storage with __set_name__
+# the Radius descriptor in (1) keeps the value on the descriptor itself, which is shared by every instance,
+# while Circle in (2) keeps it in the instance __dict__ behind a property.
+# since Python 3.6, a descriptor is told the name it is assigned to by __set_name__(owner, name), right after the
+# class is created, so it can store the value in the instance under a private name ('_radius' for 'radius').
+# if the class declares that private name in __slots__, the instance needs no __dict__ at all:
+# the value lives in a fixed slot, and the descriptor reads/writes it through the slot's own member descriptor
+_MISSING = object()
+
+
+class Validated:
+    """Base of validated attributes, subclasses implement validate(value) and raise on invalid values."""
+
+    def __init__(self, default=_MISSING):
+        self.default = default
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        self.storage_name = '_' + name
+        slot = owner.__dict__.get(self.storage_name)
+        if slot is not None and hasattr(slot, '__set__'):  # a member descriptor made by __slots__
+            self._read, self._write = slot.__get__, slot.__set__
+        else:
+            storage_name = self.storage_name
+            self._read = lambda instance, owner_: instance.__dict__[storage_name]
+            self._write = lambda instance, value: instance.__dict__.__setitem__(storage_name, value)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        try:
+            return self._read(instance, owner)
+        except (AttributeError, KeyError):
+            if self.default is _MISSING:
+                raise AttributeError(f'{owner.__name__!r} object has no attribute {self.name!r}') from None
+            return self.default
+
+    def __set__(self, instance, value):
+        self.validate(value)
+        self._write(instance, value)
+
+    def validate(self, value):
+        pass
+
+
+class NonNegative(Validated):
+    def validate(self, value):
+        if value < 0:
+            raise ValueError(f"{self.name.capitalize()} should be non-negative value")
+
+    def check_source(self, value_name):
+        """The source lines of validate() for the variable value_name, see @validated_fields in (8)."""
+        message = f"{self.name.capitalize()} should be non-negative value"
+        return [f'if {value_name} < 0: raise ValueError({message!r})']
+
+
+class Typed(Validated):
+    def __init__(self, kind, default=_MISSING):
+        super().__init__(default)
+        self.kind = kind
+
+    def validate(self, value):
+        if not isinstance(value, self.kind):
+            raise TypeError(f"{self.name} should be {self.kind.__name__}, got {type(value).__name__}")
+
+    def check_source(self, value_name, kind_name):
+        """The source lines of validate() for the variable value_name, self.kind being named kind_name."""
+        return [
+            f'if not isinstance({value_name}, {kind_name}):',
+            f'    raise TypeError(f"{self.name} should be {self.kind.__name__}, got {{type({value_name}).__name__}}")',
+        ]
+
+
+class SlottedCircle:
+    __slots__ = ('_radius',)
+    radius = NonNegative(0)
+
+    def __init__(self, val=0):
+        self.radius = val
+
+    def get_area(self):
+        return math.pi * self.radius ** 2
+
+
+# every instance has its own value, and there is no instance __dict__
+slotted_1, slotted_2 = SlottedCircle(1), SlottedCircle(2)
+assert (slotted_1.radius, slotted_2.radius) == (1, 2)
+assert not hasattr(slotted_1, '__dict__')
+assert SlottedCircle().radius == 0
+try:
+    slotted_1.radius = -1
+except ValueError as e:
+    print(e)
+assert slotted_1.radius == 1
+
+
+# without __slots__, the value goes to the instance __dict__ under the private name
+class DictCircle:
+    radius = NonNegative()
+    label = Typed(str, default='')
+
+
+dict_circle = DictCircle()
+dict_circle.radius = 3
+assert dict_circle.__dict__ == {'_radius': 3} and dict_circle.label == ''
+try:
+    dict_circle.label = 3
+except TypeError as e:
+    print(e)
+
+
+# benchmark: get/set latency and memory per instance, against property (Circle) and a plain attribute
+import sys
+import time
+import timeit
+import tracemalloc
+
+
+class PlainCircle:
+    def __init__(self, val=0):
+        self.radius = val
+
+
+class SlottedPlainCircle:
+    __slots__ = ('radius',)
+
+    def __init__(self, val=0):
+        self.radius = val
+
+
+BENCHMARK_INSTANCES = 1_000_000
+MEMORY_SAMPLE = 100_000  # bytes per instance do not depend on the count, tracing 1M allocations is just slow
+benchmark_values = list(range(BENCHMARK_INSTANCES))
+
+for circle_class in [PlainCircle, SlottedPlainCircle, Circle, SlottedCircle]:
+    obj = circle_class(1)
+    get_ns = min(timeit.repeat('obj.radius', globals={'obj': obj}, number=200_000, repeat=5)) / 200_000 * 1e9
+    set_ns = min(timeit.repeat('obj.radius = 2', globals={'obj': obj}, number=200_000, repeat=5)) / 200_000 * 1e9
+    start = time.perf_counter()
+    instances = list(map(circle_class, benchmark_values))
+    create_seconds = time.perf_counter() - start
+    del instances
+    tracemalloc.start()
+    instances = list(map(circle_class, benchmark_values[:MEMORY_SAMPLE]))
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    bytes_per_instance = (allocated - sys.getsizeof(instances)) / MEMORY_SAMPLE
+    del instances
+    print(f'{circle_class.__name__:18} get {get_ns:5.1f} ns, set {set_ns:6.1f} ns, '
+          f'1M instances in {create_seconds:.2f} s, {bytes_per_instance:5.1f} bytes/instance')
+"""
+PlainCircle        get  16.4 ns, set   16.4 ns, 1M instances in 0.85 s,  80.0 bytes/instance
+SlottedPlainCircle get  20.2 ns, set   21.2 ns, 1M instances in 0.72 s,  40.0 bytes/instance
+Circle             get  94.3 ns, set  120.7 ns, 1M instances in 0.85 s,  80.0 bytes/instance
+SlottedCircle      get 189.2 ns, set  236.6 ns, 1M instances in 0.90 s,  40.0 bytes/instance
+"""
+# the slotted descriptor halves the memory of Circle (no __dict__), but a __get__ written in Python costs
+# a Python call on every read, which "property" avoids for the lookup part; (8) below removes the per-field
+# __set__ calls at construction time
+print("-"*20)
+
+
+# (6) cached properties that know what they depend on
+# Dividing.result and Circle.get_area() in (2) and (4) are computed again on every access.
+# functools.cached_property computes once, but it never notices that radius has changed since.
+# dependent_cached_property records which tracked attributes the function reads while it runs,
+# and a tracked attribute drops exactly the cached values that read it when it is set again:
+# repeated reads cost a dict lookup, and a read after a change still gives the new result.
+# the recording is a stack (per thread) of sets: a tracked __get__ adds its name to the set on top of it,
+# and a cached property read inside another one hands its own dependencies to the outer one
+import threading
+
+_tracking = threading.local()
+
+
+def _tracking_frames():
+    try:
+        return _tracking.frames
+    except AttributeError:
+        _tracking.frames = []
+        return _tracking.frames
+
+
+class _DependencyCache:
+    __slots__ = ('values', 'dependencies', 'readers')
+
+    def __init__(self):
+        self.values = {}        # cached property -> value
+        self.dependencies = {}  # cached property -> names of the tracked attributes it read
+        self.readers = {}       # name of a tracked attribute -> cached properties that read it
+
+
+def _dependency_cache(instance):
+    # slotted classes need '_dependency_cache' in their __slots__
+    cache = getattr(instance, '_dependency_cache', None)
+    if cache is None:
+        cache = _DependencyCache()
+        object.__setattr__(instance, '_dependency_cache', cache)
+    return cache
+
+
+class Tracked:
+    """Mixin for Validated attributes, reads are recorded and writes invalidate the cached values that read them."""
+
+    def __get__(self, instance, owner):
+        value = super().__get__(instance, owner)
+        if instance is not None:
+            frames = _tracking_frames()
+            if frames:
+                frames[-1].add(self.name)
+        return value
+
+    def __set__(self, instance, value):
+        super().__set__(instance, value)
+        cache = getattr(instance, '_dependency_cache', None)
+        if cache is not None:
+            for cached_property in cache.readers.pop(self.name, ()):
+                if cache.values.pop(cached_property, _MISSING) is not _MISSING:
+                    cached_property.invalidations += 1
+                cache.dependencies.pop(cached_property, None)
+
+
+class TrackedNonNegative(Tracked, NonNegative):
+    pass
+
+
+class TrackedTyped(Tracked, Typed):
+    pass
+
+
+class dependent_cached_property:
+    def __init__(self, func):
+        self.func = func
+        self.__doc__ = func.__doc__
+        self.hits = self.misses = self.invalidations = 0
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        cache = _dependency_cache(instance)
+        frames = _tracking_frames()
+        try:
+            value = cache.values[self]
+        except KeyError:
+            self.misses += 1
+            frames.append(set())
+            try:
+                value = self.func(instance)
+            finally:
+                dependencies = frames.pop()
+            cache.values[self] = value
+            cache.dependencies[self] = dependencies
+            for name in dependencies:
+                cache.readers.setdefault(name, set()).add(self)
+        else:
+            self.hits += 1
+            dependencies = cache.dependencies[self]
+        if frames:
+            frames[-1].update(dependencies)
+        return value
+
+
+class TrackedCircle:
+    __slots__ = ('_radius', '_label', '_dependency_cache')
+    radius = TrackedNonNegative(0)
+    label = TrackedTyped(str, default='')
+
+    def __init__(self, val=0):
+        self.radius = val
+
+    @dependent_cached_property
+    def area(self):
+        return math.pi * self.radius ** 2
+
+    @dependent_cached_property
+    def description(self):
+        return f'{self.label}: {self.area:.2f}'  # depends on label and, through area, on radius
+
+
+tracked_circle = TrackedCircle(2)
+for _ in range(1000):
+    tracked_circle.area
+assert TrackedCircle.area.misses == 1 and TrackedCircle.area.hits == 999
+tracked_circle.radius = 3
+assert tracked_circle.area == math.pi * 9  # recomputed after the change
+assert TrackedCircle.area.misses == 2 and TrackedCircle.area.invalidations == 1
+
+tracked_circle.label = 'circle'
+assert tracked_circle.description == f'circle: {math.pi * 9:.2f}'
+tracked_circle.label = 'big circle'  # invalidates description only
+assert tracked_circle.description == f'big circle: {math.pi * 9:.2f}'
+assert TrackedCircle.area.misses == 2
+tracked_circle.radius = 1  # invalidates both
+assert tracked_circle.description == f'big circle: {math.pi:.2f}'
+print(f'area: {TrackedCircle.area.hit_rate=:.3f}, {TrackedCircle.area.misses=}, {TrackedCircle.area.invalidations=}')
+print(f'description: {TrackedCircle.description.hits=}, {TrackedCircle.description.misses=}, '
+      f'{TrackedCircle.description.invalidations=}')
+"""
+area: TrackedCircle.area.hit_rate=0.997, TrackedCircle.area.misses=3, TrackedCircle.area.invalidations=2
+description: TrackedCircle.description.hits=0, TrackedCircle.description.misses=3, TrackedCircle.description.invalidations=2
+"""
+
+
+# the lazy Dividing from (4), now computed once per (denominator, divider)
+class TrackedDividing:
+    denominator = TrackedNonNegative()
+    divider = TrackedNonNegative()
+
+    def __init__(self, den_, div_):
+        self.denominator = den_
+        self.divider = div_
+
+    @dependent_cached_property
+    def result(self):
+        return self.denominator/self.divider
+
+
+tracked_div = TrackedDividing(5, 2)
+assert tracked_div.result == tracked_div.result == 2.5
+tracked_div.divider = 4
+assert tracked_div.result == 1.25
+assert (TrackedDividing.result.hits, TrackedDividing.result.misses) == (1, 2)
+print("-"*20)
+
+
+# (7) one object for many circles
+# with millions of circles, one Circle object per circle costs an object header and a __dict__ each,
+# and computing all the areas costs one Python call to get_area() and one to the radius property per circle.
+# a columnar CircleArray keeps all the radii in one contiguous array('d') (8 bytes per circle),
+# checks a whole batch against the same rule as radius.setter at once, and computes all the areas in one pass.
+# NumPy is used for the batch operations when it is installed, the array module is enough otherwise.
+# a row is still available as a small CircleView object that behaves like a Circle
+import operator
+from array import array
+from itertools import repeat
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class CircleArray:
+    def __init__(self, radii=(), use_numpy=None):
+        self._use_numpy = numpy is not None if use_numpy is None else use_numpy
+        self._radii = array('d')
+        self.extend(radii)
+
+    def _check_radii(self, radii):
+        # the same rule (and message) as Circle.radius.setter, "val < 0" for every value in one pass
+        if self._use_numpy:
+            negative = bool((numpy.frombuffer(radii, dtype=numpy.float64) < 0).any()) if radii else False
+        else:
+            negative = any(map((0.0).__gt__, radii))
+        if negative:
+            raise ValueError("Radius should be non-negative value")
+
+    def extend(self, radii):
+        new_radii = array('d', radii)
+        self._check_radii(new_radii)  # nothing is added if any value is invalid
+        self._radii.extend(new_radii)
+
+    def append(self, radius):
+        self.extend((radius,))
+
+    def __len__(self):
+        return len(self._radii)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CircleArray(self._radii[index], use_numpy=self._use_numpy)
+        if index < 0:
+            index += len(self._radii)
+        if not 0 <= index < len(self._radii):
+            raise IndexError('CircleArray index out of range')
+        return CircleView(self, index)
+
+    def __iter__(self):
+        return map(CircleView, repeat(self), range(len(self._radii)))
+
+    def get_radius(self, index):
+        return self._radii[index]
+
+    def set_radius(self, index, val):
+        if val < 0:
+            raise ValueError("Radius should be non-negative value")
+        self._radii[index] = val
+
+    def get_area(self):
+        if self._use_numpy:
+            radii = numpy.frombuffer(self._radii, dtype=numpy.float64)
+            return array('d', (math.pi * radii ** 2).tobytes())
+        radii = self._radii
+        return array('d', map(operator.mul, repeat(math.pi), map(operator.mul, radii, radii)))
+
+
+class CircleView:
+    __slots__ = ('_circles', '_index')
+
+    def __init__(self, circles, index):
+        self._circles = circles
+        self._index = index
+
+    @property
+    def radius(self):
+        return self._circles.get_radius(self._index)
+
+    @radius.setter
+    def radius(self, val):
+        self._circles.set_radius(self._index, val)
+
+    def get_area(self):
+        return math.pi * self.radius ** 2
+
+
+circles = CircleArray([1, 2, 3])
+assert [c.radius for c in circles] == [1, 2, 3]
+assert list(circles.get_area()) == [Circle(r).get_area() for r in [1, 2, 3]]
+circles[0].radius = 4
+assert circles[0].get_area() == Circle(4).get_area()
+for bad_value in [-1, [5, -1]]:
+    try:
+        circles.extend(bad_value if isinstance(bad_value, list) else [bad_value])
+    except ValueError as e:
+        print(e)
+try:
+    circles[-1].radius = -1
+except ValueError as e:
+    print(e)
+assert len(circles) == 3  # invalid batches are rejected as a whole
+
+
+# benchmark: 1M circles as Circle objects against one CircleArray
+benchmark_radii = [i % 100 for i in range(BENCHMARK_INSTANCES)]
+start = time.perf_counter()
+circle_objects = list(map(Circle, benchmark_radii))
+objects_build_seconds = time.perf_counter() - start
+start = time.perf_counter()
+objects_areas = [c.get_area() for c in circle_objects]
+objects_area_seconds = time.perf_counter() - start
+del circle_objects
+tracemalloc.start()
+circle_objects = list(map(Circle, benchmark_radii[:MEMORY_SAMPLE]))
+objects_bytes = tracemalloc.get_traced_memory()[0] * (BENCHMARK_INSTANCES / MEMORY_SAMPLE)
+tracemalloc.stop()
+del circle_objects
+
+start = time.perf_counter()
+circle_array = CircleArray(benchmark_radii)
+array_build_seconds = time.perf_counter() - start
+start = time.perf_counter()
+array_areas = circle_array.get_area()
+array_area_seconds = time.perf_counter() - start
+array_bytes = sys.getsizeof(circle_array._radii)
+
+assert list(array_areas) == objects_areas
+print(f'Circle objects: build {objects_build_seconds:.2f} s, {objects_bytes / 2 ** 20:.1f} MiB, '
+      f'areas {objects_area_seconds * 1e3:.0f} ms')
+print(f'CircleArray ({"numpy" if circle_array._use_numpy else "array"}): build {array_build_seconds:.2f} s, '
+      f'{array_bytes / 2 ** 20:.1f} MiB, areas {array_area_seconds * 1e3:.0f} ms')
+"""
+Circle objects: build 0.93 s, 83.9 MiB, areas 335 ms
+CircleArray (array): build 0.14 s, 8.1 MiB, areas 165 ms
+"""
+print("-"*20)
+
+
+# (8) generating __init__ and update() from the declared fields
+# with validated descriptors from (5), "self.radius = val" in __init__ is a Python call to Validated.__set__,
+# which calls validate(), which calls the slot's __set__: three calls per field, for every field of every object.
+# like dataclasses, the @validated_fields decorator reads the fields declared on the class and writes the source
+# of one __init__ (and one bulk update()) for them, compiled with exec():
+# - the check of every field is inlined as an "if ...: raise ..." line, taken from check_source() of its descriptor
+#   (a descriptor without check_source(), with its own __set__ like Tracked, or with a validate() overridden
+#   after check_source() was written, keeps being called instead)
+# - the value is then stored straight into its storage slot ('_radius'), one STORE_ATTR
+# - all the values are checked before any is stored (the fields that are not inlined by a call of their validate()),
+#   so a failing update() leaves the object unchanged
+def _inlinable(field):
+    # check_source() is the source of the validate() defined next to it: a subclass that overrides validate()
+    # (and not check_source()) must keep being called, or its own check would be skipped
+    kind = type(field)
+    if kind.__set__ is not Validated.__set__:
+        return False
+    for klass in kind.__mro__:
+        if 'check_source' in klass.__dict__:
+            return kind.validate is klass.__dict__.get('validate')
+    return False
+
+
+def _validated_fields_of(cls):
+    fields = {}
+    for klass in reversed(cls.__mro__):
+        for name, value in klass.__dict__.items():
+            if isinstance(value, Validated):
+                fields[name] = value
+    return fields
+
+
+def validated_fields(cls):
+    fields = _validated_fields_of(cls)
+    namespace = {'_MISSING': _MISSING}
+    params, update_params, checks, stores, update_stores = [], [], [], [], []
+    seen_default = False
+    for name, field in fields.items():
+        if field.default is not _MISSING:
+            namespace[f'_default_{name}'] = field.default
+            params.append(f'{name}=_default_{name}')
+            seen_default = True
+        elif seen_default:
+            raise TypeError(f'non-default field {name!r} follows a field with a default')
+        else:
+            params.append(name)
+        update_params.append(f'{name}=_MISSING')
+        if _inlinable(field):
+            if isinstance(field, Typed):
+                namespace[f'_kind_{name}'] = field.kind
+                check_lines = field.check_source(name, f'_kind_{name}')
+            else:
+                check_lines = field.check_source(name)
+            checks.append(check_lines)
+            stores.append(f'self.{field.storage_name} = {name}')
+        else:
+            # not inlined: let the descriptor validate and store (and do whatever else its __set__ does)
+            namespace[f'_field_{name}'] = field
+            checks.append([])
+            stores.append(f'_field_{name}.__set__(self, {name})')
+
+    init_lines = [f'def __init__(self, {", ".join(params)}):']
+    for check_lines in checks:
+        init_lines.extend('    ' + line for line in check_lines)
+    init_lines.extend('    ' + line for line in stores)
+    if not fields:
+        init_lines.append('    pass')
+
+    update_lines = [f'def update(self, *, {", ".join(update_params)}):']
+    for name, check_lines in zip(fields, checks):
+        if not check_lines:  # not inlined: validate() is called before any store, __set__ validates again
+            check_lines = [f'_field_{name}.validate({name})']
+        update_lines.append(f'    if {name} is not _MISSING:')
+        update_lines.extend('        ' + line for line in check_lines)
+    for name, store in zip(fields, stores):
+        update_lines.append(f'    if {name} is not _MISSING: {store}')
+    if not fields:
+        update_lines.append('    pass')
+
+    source = '\n'.join(init_lines) + '\n\n' + '\n'.join(update_lines) + '\n'
+    exec(source, namespace)
+    for method_name in (['__init__'] if '__init__' not in cls.__dict__ else []) + ['update']:
+        method = namespace[method_name]
+        method.__qualname__ = f'{cls.__qualname__}.{method_name}'
+        method.__module__ = cls.__module__
+        setattr(cls, method_name, method)
+    cls.__validated_source__ = source
+    return cls
+
+
+@validated_fields
+class CompiledCircle:
+    __slots__ = ('_radius', '_label')
+    radius = NonNegative()
+    label = Typed(str, default='')
+
+    def get_area(self):
+        return math.pi * self.radius ** 2
+
+
+print(CompiledCircle.__validated_source__)
+"""
+def __init__(self, radius, label=_default_label):
+    if radius < 0: raise ValueError('Radius should be non-negative value')
+    if not isinstance(label, _kind_label):
+        raise TypeError(f"label should be str, got {type(label).__name__}")
+    self._radius = radius
+    self._label = label
+
+def update(self, *, radius=_MISSING, label=_MISSING):
+    if radius is not _MISSING:
+        if radius < 0: raise ValueError('Radius should be non-negative value')
+    if label is not _MISSING:
+        if not isinstance(label, _kind_label):
+            raise TypeError(f"label should be str, got {type(label).__name__}")
+    if radius is not _MISSING: self._radius = radius
+    if label is not _MISSING: self._label = label
+"""
+compiled_circle = CompiledCircle(2, label='c')
+assert (compiled_circle.radius, compiled_circle.label, compiled_circle.get_area()) == (2, 'c', Circle(2).get_area())
+compiled_circle.update(radius=3)
+assert compiled_circle.radius == 3
+for bad_update in [{'radius': -1}, {'label': 1}, {'radius': 5, 'label': 1}]:
+    try:
+        compiled_circle.update(**bad_update)
+    except (ValueError, TypeError) as e:
+        print(e)
+assert (compiled_circle.radius, compiled_circle.label) == (3, 'c')  # unchanged by the failed updates
+compiled_circle.radius = 4  # the descriptors still validate single assignments
+assert compiled_circle.radius == 4
+
+
+# a subclass with its own validate() is not inlined with the check_source() of its parent
+class Positive(NonNegative):
+    def validate(self, value):
+        if value <= 0:
+            raise ValueError(f"{self.name.capitalize()} should be positive value")
+
+
+@validated_fields
+class PositiveRecord:
+    __slots__ = ('_a', '_x')
+    a = NonNegative(0)
+    x = Positive(1)
+
+
+assert '_field_x.__set__(self, x)' in PositiveRecord.__validated_source__
+positive_record = PositiveRecord()
+try:
+    positive_record.update(a=5, x=0)
+except ValueError:
+    pass
+assert (positive_record.a, positive_record.x) == (0, 1)  # x failed, so a was not stored either
+for build_zero in [lambda: PositiveRecord(x=0), lambda: PositiveRecord().update(x=0)]:
+    try:
+        build_zero()
+    except ValueError:
+        pass
+    else:
+        raise AssertionError('PositiveRecord accepted 0')
+
+
+# benchmark: a record with 20 validated fields, __init__ through the descriptors against the generated one
+# interned like the names written in source code, keyword arguments are matched by identity first
+RECORD_FIELDS = [sys.intern(f'field_{i}') for i in range(20)]
+
+
+def record_namespace():
+    namespace = {'__slots__': tuple('_' + name for name in RECORD_FIELDS)}
+    namespace.update({name: NonNegative() for name in RECORD_FIELDS})  # new descriptors for every class
+    return namespace
+
+
+descriptor_record_namespace = record_namespace()
+exec(
+    f'def __init__(self, {", ".join(RECORD_FIELDS)}):\n'
+    + ''.join(f'    self.{name} = {name}\n' for name in RECORD_FIELDS),
+    descriptor_record_namespace,
+)
+del descriptor_record_namespace['__builtins__']
+DescriptorRecord = type('DescriptorRecord', (), descriptor_record_namespace)
+CompiledRecord = validated_fields(type('CompiledRecord', (), record_namespace()))
+
+record_values = list(range(20))
+record_changes = dict(zip(RECORD_FIELDS, range(20, 40)))
+
+
+def update_through_descriptors(record, changes):
+    for name, value in changes.items():
+        setattr(record, name, value)
+
+
+benchmark_globals = {
+    'DescriptorRecord': DescriptorRecord, 'CompiledRecord': CompiledRecord, 'values': record_values,
+    'changes': record_changes, 'update_through_descriptors': update_through_descriptors,
+    'descriptor_record': DescriptorRecord(*record_values), 'compiled_record': CompiledRecord(*record_values),
+}
+for label, descriptor_stmt, compiled_stmt in [
+    ('__init__', 'DescriptorRecord(*values)', 'CompiledRecord(*values)'),
+    ('update', 'update_through_descriptors(descriptor_record, changes)', 'compiled_record.update(**changes)'),
+]:
+    descriptor_us, compiled_us = (
+        min(timeit.repeat(stmt, globals=benchmark_globals, number=20_000, repeat=5)) / 20_000 * 1e6
+        for stmt in (descriptor_stmt, compiled_stmt)
+    )
+    print(f'20 fields {label:8}: descriptors {descriptor_us:.2f} us, generated {compiled_us:.2f} us, '
+          f'{descriptor_us / compiled_us:.1f}x faster')
+"""
+20 fields __init__: descriptors 4.01 us, generated 0.77 us, 5.2x faster
+20 fields update  : descriptors 7.17 us, generated 1.96 us, 3.7x faster
+"""
@@ -1,4 +1,5 @@
 import collections.abc
+from array import array
 
 
 class NaturalNumbers:
@@ -21,6 +22,16 @@ class NaturalNumbers:
             raise StopIteration
         return self.internal_state
 
+    def next_chunk(self, n, as_array=False):
+        """
+        Optional batch version of __next__: return the next (at most) n numbers at once,
+        as a range (or an array('q')), an empty one when the iteration is over.
+        """
+        start = self.internal_state + 1
+        stop = max(start, min(start + n, self.max_iter_times))
+        self.internal_state = stop - 1
+        return array('q', range(start, stop)) if as_array else range(start, stop)
+
 
 # use collections.abc.Iterator to check whether class NaturalNumbers follows the iterator protocol
 # the following assertion is True, so that the class follows the iterator protocol
@@ -81,3 +92,291 @@ assert isinstance(NaturalNumberGenerator().__iter__(), collections.abc.Generator
 
 nng = NaturalNumberGenerator(iter_times)
 print([_ for _ in nng])
+
+
+# ----APPENDIX: chunked iteration----------------------------------------
+# every value of NaturalNumbers costs one __next__ call (a Python function call) and one attribute update.
+# next_chunk(n) hands out n values per call as a range: the per-value work is left to C code (range iteration,
+# sum(), array()...), and the Python-level cost is paid once per chunk.
+# the helpers below let a "for" loop or a consumer like sum() use next_chunk() when the iterator has it,
+# and fall back to itertools.islice() for any other iterator
+import itertools
+import time
+
+
+def iter_chunks(iterator, size=65536):
+    next_chunk = getattr(iterator, 'next_chunk', None)
+    if next_chunk is not None:
+        while chunk := next_chunk(size):
+            yield chunk
+    else:
+        iterator = iter(iterator)
+        while chunk := list(itertools.islice(iterator, size)):
+            yield chunk
+
+
+def iterate_chunked(iterator, size=65536):
+    # the values one by one, for a "for" loop, but fetched chunk by chunk
+    return itertools.chain.from_iterable(iter_chunks(iterator, size))
+
+
+def sum_chunked(iterator, size=65536):
+    return sum(map(sum, iter_chunks(iterator, size)))
+
+
+nn3 = NaturalNumbers(10)
+assert list(nn3.next_chunk(3)) == [0, 1, 2]
+assert next(nn3) == 3  # the batch API and the protocol share the same state
+assert nn3.next_chunk(4, as_array=True) == array('q', [4, 5, 6, 7])
+assert list(nn3.next_chunk(100)) == [8, 9] and not nn3.next_chunk(100)
+assert list(iterate_chunked(NaturalNumbers(10), size=3)) == list(range(10))
+assert sum_chunked(NaturalNumberGenerator(10), size=3) == sum(range(10))  # works without next_chunk, too
+
+
+# benchmark: sum of the first 10^7 natural numbers
+BENCHMARK_N = 10 ** 7
+for label, consume in [
+    ('NaturalNumbers, per item', lambda: sum(NaturalNumbers(BENCHMARK_N))),
+    ('NaturalNumberGenerator', lambda: sum(NaturalNumberGenerator(BENCHMARK_N))),
+    ('itertools.count', lambda: sum(itertools.islice(itertools.count(), BENCHMARK_N))),
+    ('NaturalNumbers, chunked for', lambda: sum(iterate_chunked(NaturalNumbers(BENCHMARK_N)))),
+    ('NaturalNumbers, sum_chunked', lambda: sum_chunked(NaturalNumbers(BENCHMARK_N))),
+]:
+    start = time.perf_counter()
+    assert consume() == BENCHMARK_N * (BENCHMARK_N - 1) // 2
+    print(f'{label:30} {time.perf_counter() - start:6.3f} s')
+"""
+NaturalNumbers, per item        0.728 s
+NaturalNumberGenerator          0.477 s
+itertools.count                 0.209 s
+NaturalNumbers, chunked for     0.201 s
+NaturalNumbers, sum_chunked     0.171 s
+"""
+
+
+# ----APPENDIX: a sequence of natural numbers----------------------------
+# NaturalNumbers is its own iterator (__iter__ returns self), so an object can be iterated only once,
+# and reaching the k-th number costs k calls of __next__.
+# NaturalNumberSequence separates the two roles, like list and list_iterator (or range and range_iterator):
+# - the sequence is immutable and can be iterated any number of times; since the numbers follow a formula
+#   (backed by a range), len(), indexing, slicing and "in" are O(1)
+# - each iterator keeps its own position: iter_from(offset) starts anywhere in O(1), skip(k) is O(1),
+#   and checkpoint() returns a plain tuple from which resume() rebuilds the iterator (e.g. after a restart)
+# - partition(n) splits the sequence into n contiguous parts of (almost) equal length, so that n workers can
+#   each take one part and never need to coordinate
+class NaturalNumberSequence(collections.abc.Sequence):
+    def __init__(self, max_iter_times=1000):
+        self._numbers = range(max_iter_times)
+
+    @classmethod
+    def _from_range(cls, numbers):
+        sequence = cls.__new__(cls)
+        sequence._numbers = numbers
+        return sequence
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._from_range(self._numbers[index])
+        return self._numbers[index]
+
+    def __contains__(self, value):
+        return value in self._numbers
+
+    def index(self, value, start=0, stop=None):
+        # range.index() takes no start/stop: search the slice, which is a range too, O(1)
+        start, stop, _ = slice(start, stop).indices(len(self._numbers))
+        try:
+            return start + self._numbers[start:stop].index(value)
+        except ValueError:
+            raise ValueError(f'{value!r} is not in {type(self).__name__}') from None
+
+    def count(self, value):
+        return self._numbers.count(value)
+
+    def __iter__(self):
+        return NaturalNumberIterator(self._numbers)
+
+    def __reversed__(self):
+        return NaturalNumberIterator(self._numbers[::-1])
+
+    def iter_from(self, offset):
+        # a negative offset counts from the end, like an index
+        if offset < 0:
+            offset = max(0, len(self._numbers) + offset)
+        return NaturalNumberIterator(self._numbers, offset)
+
+    def partition(self, n):
+        size = len(self._numbers)
+        return [self[i * size // n:(i + 1) * size // n] for i in range(n)]
+
+    def __eq__(self, other):
+        if isinstance(other, NaturalNumberSequence):
+            return self._numbers == other._numbers
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._numbers)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._numbers!r})'
+
+
+class NaturalNumberIterator:
+    def __init__(self, numbers, position=0):
+        self.numbers = numbers
+        self.position = min(max(0, position), len(numbers))  # also clamps a position given to resume()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        position = self.position
+        if position >= len(self.numbers):
+            raise StopIteration
+        self.position = position + 1
+        return self.numbers[position]
+
+    def __length_hint__(self):
+        return max(0, len(self.numbers) - self.position)
+
+    def skip(self, k):
+        self.position = min(max(0, self.position + k), len(self.numbers))  # a negative k rewinds, at most to 0
+
+    def next_chunk(self, n, as_array=False):
+        chunk = self.numbers[self.position:self.position + n]
+        self.position += len(chunk)
+        return array('q', chunk) if as_array else chunk
+
+    def checkpoint(self):
+        numbers = self.numbers
+        return numbers.start, numbers.stop, numbers.step, self.position
+
+    @classmethod
+    def resume(cls, checkpoint):
+        start, stop, step, position = checkpoint
+        return cls(range(start, stop, step), position)
+
+
+nns = NaturalNumberSequence(10 ** 12)  # nothing is materialized
+assert len(nns) == 10 ** 12 and nns[-1] == 10 ** 12 - 1 and 123_456_789 in nns and -1 not in nns
+assert list(nns[10:20:5]) == [10, 15] and len(nns[::2]) == 5 * 10 ** 11
+assert list(itertools.islice(nns, 3)) == list(itertools.islice(nns, 3)) == [0, 1, 2]  # iterable more than once
+assert isinstance(nns, collections.abc.Sequence) and not isinstance(nns, collections.abc.Iterator)
+
+nns_iterator = nns.iter_from(10 ** 9)
+assert next(nns_iterator) == 10 ** 9
+nns_iterator.skip(10 ** 9)
+saved = nns_iterator.checkpoint()
+assert next(nns_iterator) == 2 * 10 ** 9 + 1
+resumed = NaturalNumberIterator.resume(saved)
+assert next(resumed) == 2 * 10 ** 9 + 1 and list(resumed.next_chunk(3)) == [2 * 10 ** 9 + 2, 2 * 10 ** 9 + 3, 2 * 10 ** 9 + 4]
+resumed.skip(-3)
+assert next(resumed) == 2 * 10 ** 9 + 2
+resumed.skip(-10 ** 13)
+assert resumed.position == 0 and next(resumed) == 0
+assert NaturalNumberIterator.resume((0, 10, 1, -5)).position == 0
+assert list(NaturalNumberIterator.resume((0, 10, 1, 50))) == [] and NaturalNumberIterator.resume((0, 10, 1, 50)).position == 10
+
+assert nns.index(5) == 5 and nns.index(10 ** 6, 2, -1) == 10 ** 6
+assert list(nns.iter_from(-3)) == [10 ** 12 - 3, 10 ** 12 - 2, 10 ** 12 - 1]
+for value, start, stop in [(5, 6, None), (5, 0, 5), (-1, 0, None)]:
+    try:
+        nns.index(value, start, stop)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError(f'{value} found in nns[{start}:{stop}]')
+
+parts = NaturalNumberSequence(10).partition(3)
+print(parts)
+"""
+[NaturalNumberSequence(range(0, 3)), NaturalNumberSequence(range(3, 6)), NaturalNumberSequence(range(6, 10))]
+"""
+assert [n for part in parts for n in part] == list(range(10))
+assert sum_chunked(iter(nns[:BENCHMARK_N])) == BENCHMARK_N * (BENCHMARK_N - 1) // 2
+
+
+# ----APPENDIX: parallel map over chunks----------------------------------
+# everything above runs in one thread of one process. For a CPU-bound function of each item, the items can be
+# split into chunks and handed to a pool of processes (the GIL keeps threads from running Python code in parallel):
+# - a range-like source (range, NaturalNumberSequence) is split by slicing, so a chunk is sent to a worker as a
+#   tiny range object, not as a list of its numbers; any other iterable (e.g. a generator) is cut into lists
+# - the results come back in the order of the source, chunk after chunk, as a stream
+# - at most max_in_flight chunks are submitted and not yet consumed, so the memory stays flat however long the
+#   source is, and a slow consumer slows the submission down instead of piling up results
+# the workers are forked (Linux), so func can be any module-level function, also one defined in __main__
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _map_chunk(func, chunk):
+    return list(map(func, chunk))
+
+
+def _split_source(source, chunk):
+    if isinstance(source, (range, NaturalNumberSequence)):
+        for start in range(0, len(source), chunk):
+            yield source[start:start + chunk]
+    else:
+        yield from iter_chunks(source, chunk)
+
+
+def parallel_map(func, source, workers=None, chunk=10_000, max_in_flight=None):
+    workers = workers or os.cpu_count()
+    max_in_flight = max_in_flight or 2 * workers
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('fork'))
+    pending = deque()
+    try:
+        for piece in _split_source(source, chunk):
+            if len(pending) >= max_in_flight:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_map_chunk, func, piece))
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        # also reached when the consumer stops early (the generator is closed), drop what is still queued
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def slow_even_or_none(x):
+    # the even-number filter of two_generators.py, with some arithmetic to make each item CPU-bound
+    acc = x
+    for i in range(300):
+        acc = (acc * 31 + i) % 1_000_003
+    return x if not x % 2 else None
+
+
+assert list(parallel_map(abs, range(-5, 5), workers=2, chunk=3)) == list(map(abs, range(-5, 5)))
+assert list(parallel_map(abs, (-x for x in range(10)), workers=2, chunk=3)) == list(range(10))
+assert list(itertools.islice(parallel_map(abs, NaturalNumberSequence(10 ** 12), workers=2), 3)) == [0, 1, 2]
+
+
+# benchmark: the CPU-bound even filter over 100k numbers, serial against 1..N worker processes
+PARALLEL_N = 100_000
+start = time.perf_counter()
+serial_evens = [x for x in map(slow_even_or_none, range(PARALLEL_N)) if x is not None]
+serial_seconds = time.perf_counter() - start
+print(f'serial       {serial_seconds:6.2f} s')
+for workers in sorted({1, 2, 4, os.cpu_count()}):
+    start = time.perf_counter()
+    parallel_evens = [
+        x for x in parallel_map(slow_even_or_none, NaturalNumberSequence(PARALLEL_N), workers=workers, chunk=5_000)
+        if x is not None
+    ]
+    parallel_seconds = time.perf_counter() - start
+    assert parallel_evens == serial_evens
+    print(f'{workers:2} workers   {parallel_seconds:6.2f} s, speedup {serial_seconds / parallel_seconds:.1f}x')
+"""
+serial         1.98 s
+ 1 workers     2.07 s, speedup 1.0x
+ 2 workers     2.00 s, speedup 1.0x
+ 4 workers     2.13 s, speedup 0.9x
+"""
+# this run had os.cpu_count() == 1, so the workers only share one core: it shows the overhead of the chunked
+# transport is small (a 5000-number chunk travels as one range object); with one free core per worker, the
+# speedup grows with the number of workers up to the number of cores
@@ -2,6 +2,8 @@
 # The mixin design pattern uses multiple inheritance to flexibly add new features to the base classes
 
 class Animal:
+    __slots__ = ()
+
     def live(self): return
 
 """
@@ -32,20 +34,101 @@ If use the classical and traditional single inheritance / TEMPLATE method design
 """
 
 
+# the mixins register themselves as capabilities (see "Capability registry" at the end):
+# every capability gets a bit, and every class that inherits capabilities gets the mask of their bits.
+# classes_with() only lists the classes that also derive from a class that is not a Capability (like Animal):
+# mixins made of other mixins (class WadingMixin(RunningMixin, SwimmingMixin)) are building blocks, not animals
+import gc
+import weakref
+from itertools import compress
+
+
+class Capability:
+    __slots__ = ()
+    _bits = {}  # capability class -> its bit
+    _masks = weakref.WeakKeyDictionary()  # every subclass that is not only made of capabilities -> its mask
+    _type_masks = weakref.WeakKeyDictionary()  # any type passed to filter() -> the mask of its capabilities
+
+    def __init_subclass__(cls, capability=False, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if capability:
+            Capability._bits[cls] = 1 << len(Capability._bits)
+        cls.__capabilities__ = Capability._mask_of_type(cls)
+        if any(not issubclass(klass, Capability) for klass in cls.__mro__[:-1]):  # object excepted
+            Capability._masks[cls] = cls.__capabilities__
+
+    @staticmethod
+    def _mask_of_type(cls):
+        mask = 0
+        for klass in cls.__mro__:
+            mask |= Capability._bits.get(klass, 0)
+        return mask
+
+    @staticmethod
+    def mask(*capabilities):
+        mask = 0
+        for capability in capabilities:
+            if (bit := Capability._bits.get(capability)) is None:
+                raise TypeError(f'{capability.__qualname__} is not a capability')
+            mask |= bit
+        return mask
+
+    def has(self, *capabilities):
+        wanted = Capability.mask(*capabilities)
+        return self.__capabilities__ & wanted == wanted
+
+    @staticmethod
+    def classes_with(*capabilities):
+        """The classes (the mixins excepted) that have all the capabilities."""
+        wanted = Capability.mask(*capabilities)
+        return [cls for cls, mask in list(Capability._masks.items()) if mask & wanted == wanted]
+
+    @staticmethod
+    def filter(objects, *capabilities):
+        """The objects, of any type, that have all the capabilities."""
+        matches = _TypeMatches(Capability.mask(*capabilities))
+        if not isinstance(objects, (list, tuple)):
+            objects = list(objects)  # it is read twice
+        # only C loops: type() of every object, one dict lookup per object, compress() keeps the matching ones
+        return list(compress(objects, map(matches.__getitem__, map(type, objects))))
+
+
+class _TypeMatches(dict):
+    """type -> whether it has all the capabilities of the mask, computed with the cached mask of the type"""
+
+    def __init__(self, wanted):
+        super().__init__()
+        self.wanted = wanted
+
+    def __missing__(self, cls):
+        if (mask := Capability._type_masks.get(cls)) is None:
+            mask = Capability._type_masks[cls] = Capability._mask_of_type(cls)
+        self[cls] = matches = mask & self.wanted == self.wanted
+        return matches
+
+
 # use MIXIN design pattern to first implement the mixin classes :
-class FlyingMixin:
+class FlyingMixin(Capability, capability=True):
+    __slots__ = ()
+
     def fly(self): return
 
 
-class SwimmingMixin:
+class SwimmingMixin(Capability, capability=True):
+    __slots__ = ()
+
     def swim(self): return
 
 
-class RunningMixin:
+class RunningMixin(Capability, capability=True):
+    __slots__ = ()
+
     def run(self): return
 
 
-class PeckingMixin:
+class PeckingMixin(Capability, capability=True):
+    __slots__ = ()
+
     def peck(self): return
 
 
@@ -64,3 +147,216 @@ while use MIXIN design pattern to simply combining the mixin classes:
 """
 class Chicken(Animal, RunningMixin, PeckingMixin): pass
 class Seagull(Animal, SwimmingMixin, FlyingMixin): pass
+
+
+"""
+Composing at runtime:
+when the combinations come from a configuration, they cannot all be written by hand. compose() builds them with
+type(), and caches every class it builds:
+    - compose(Animal, RunningMixin, SwimmingMixin) is the same class object every time it is asked for, so the
+      instances of a combination share one type (isinstance and the method caches of the interpreter work per
+      type, a new type per request would make all of them miss)
+    - every class built gets a name of its own (Slotted... with slots, and a number if the name is taken), and is
+      bound under that name in this module, so pickle can find it again: its instances can be pickled
+    - the key of the cache is normalized: a mixin given twice, or already in the MRO of the base or of another
+      mixin, is dropped (the order of the others is kept, it decides the MRO)
+    - with slots=('name', ...), the class gets __slots__ instead of a __dict__ per instance. That only saves memory
+      if every class of the MRO has __slots__ too, that is why Animal and the mixins above declare __slots__ = ()
+      (an empty __slots__ adds nothing to the instances, and does not stop subclasses like Duck from having a __dict__)
+"""
+import sys
+import time
+import tracemalloc
+
+_composed = {}
+
+
+def _normalize(base, mixins):
+    kept = []
+    for mixin in mixins:
+        if mixin in kept or issubclass(base, mixin):
+            continue
+        kept.append(mixin)
+    return tuple(mixin for mixin in kept
+                 if not any(other is not mixin and issubclass(other, mixin) for other in kept))
+
+
+def compose(base, *mixins, slots=None):
+    """The class made of base and the mixins, built once per (base, mixins, slots) combination."""
+    slots = None if slots is None else tuple(slots)
+    if (cls := _composed.get((base, mixins, slots))) is not None:  # asked for with these very arguments before
+        return cls
+    normalized = _normalize(base, mixins)
+    if (cls := _composed.get((base, normalized, slots))) is None:
+        namespace = {'__module__': __name__}
+        if slots is not None:
+            missing = [klass.__qualname__ for parent in (base,) + normalized for klass in parent.__mro__
+                       if klass is not object and '__slots__' not in vars(klass)]
+            if missing:
+                raise TypeError(f'cannot compose with slots: {", ".join(dict.fromkeys(missing))} has no __slots__')
+            namespace['__slots__'] = slots
+        name = ''.join(mixin.__name__.removesuffix('Mixin') for mixin in normalized) + base.__name__
+        if slots is not None:
+            name = 'Slotted' + name
+        unique_name, number = name, 1
+        while unique_name in globals():  # e.g. the same mixins with other slots
+            number += 1
+            unique_name = f'{name}{number}'
+        cls = type(unique_name, (base,) + normalized, namespace)
+        globals()[unique_name] = _composed[(base, normalized, slots)] = cls
+    return _composed.setdefault((base, mixins, slots), cls)
+
+
+RunningSwimmingAnimal = compose(Animal, RunningMixin, SwimmingMixin)
+assert RunningSwimmingAnimal.__mro__[1:] == Duck.__mro__[1:]
+assert compose(Animal, RunningMixin, SwimmingMixin, RunningMixin) is RunningSwimmingAnimal
+assert compose(Animal, Animal, RunningMixin, SwimmingMixin) is RunningSwimmingAnimal
+assert compose(Duck, RunningMixin, FlyingMixin) is compose(Duck, FlyingMixin)  # RunningMixin is in the MRO of Duck
+
+
+class WadingMixin(RunningMixin, SwimmingMixin):
+    __slots__ = ()
+
+
+assert compose(Animal, SwimmingMixin, WadingMixin) is compose(Animal, WadingMixin)
+assert compose(Animal, SwimmingMixin, RunningMixin) is not RunningSwimmingAnimal  # another MRO
+assert RunningSwimmingAnimal.__name__ == 'RunningSwimmingAnimal'
+
+SlottedGoose = compose(Animal, RunningMixin, SwimmingMixin, FlyingMixin, PeckingMixin, slots=('name', 'weight'))
+goose = SlottedGoose()
+goose.name = 'goose'
+assert not hasattr(goose, '__dict__')
+try:
+    goose.colour = 'white'
+except AttributeError as e:
+    print(e)
+    """
+    'SlottedRunningSwimmingFlyingPeckingAnimal' object has no attribute 'colour'
+    """
+try:
+    compose(Duck, FlyingMixin, slots=('name',))
+except TypeError as e:
+    print(e)
+    """
+    cannot compose with slots: Duck has no __slots__
+    """
+
+# every composed class pickles under its own name, with or without slots
+import pickle
+
+goose.weight = 3
+unpickled_goose = pickle.loads(pickle.dumps(goose))
+assert type(unpickled_goose) is SlottedGoose and (unpickled_goose.name, unpickled_goose.weight) == ('goose', 3)
+dict_goose = compose(Animal, RunningMixin, SwimmingMixin, FlyingMixin, PeckingMixin)()
+dict_goose.name = 'goose'
+assert type(pickle.loads(pickle.dumps(dict_goose))) is type(dict_goose) is not SlottedGoose
+other_slots = compose(Animal, RunningMixin, SwimmingMixin, FlyingMixin, PeckingMixin, slots=('name',))
+assert other_slots.__name__ == 'SlottedRunningSwimmingFlyingPeckingAnimal2'
+assert type(pickle.loads(pickle.dumps(other_slots()))) is other_slots
+
+# benchmark: the classes, and their instances, with and without slots
+ALL_MIXINS = (RunningMixin, SwimmingMixin, FlyingMixin, PeckingMixin)
+start = time.perf_counter()
+for _ in range(10_000):
+    type('Goose', (Animal,) + ALL_MIXINS, {})
+type_seconds = time.perf_counter() - start
+start = time.perf_counter()
+for _ in range(10_000):
+    compose(Animal, *ALL_MIXINS)
+compose_seconds = time.perf_counter() - start
+print(f'10000 classes: type() {type_seconds * 1e3:.0f} ms, compose() {compose_seconds * 1e3:.1f} ms')
+
+
+def make_animals(cls, n):
+    animals = []
+    for i in range(n):
+        animal = cls()
+        animal.name = 'goose'
+        animal.weight = i
+        animals.append(animal)
+    return animals
+
+
+N = 100_000
+for label, cls in [('dict', compose(Animal, *ALL_MIXINS)), ('slots', compose(Animal, *ALL_MIXINS, slots=('name', 'weight')))]:
+    start = time.perf_counter()
+    make_animals(cls, N)
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    animals = make_animals(cls, N)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del animals
+    print(f'{N} instances with {label}: {seconds * 1e3:.0f} ms, {memory / N:.0f} bytes each '
+          f'(getsizeof {sys.getsizeof(cls())})')
+"""
+10000 classes: type() 99 ms, compose() 3.4 ms
+100000 instances with dict: 27 ms, 128 bytes each (getsizeof 56)
+100000 instances with slots: 18 ms, 88 bytes each (getsizeof 48)
+"""
+
+
+"""
+Capability registry:
+the capability of an animal is the mixin it inherits, so "can it swim and fly?" is usually asked as
+    isinstance(animal, SwimmingMixin) and isinstance(animal, FlyingMixin)
+and every isinstance() walks the MRO of the type. Capability, the base of the mixins, keeps the answers as bits:
+    - each mixin declared with "capability=True" gets a bit when it is defined (__init_subclass__)
+    - each subclass, written by hand or built by compose(), gets __capabilities__, the mask of all the bits of its MRO
+    - classes_with(), has() and filter() turn the mixins asked for into one mask, and compare it with an "&"
+    - filter() accepts objects of any type: the mask of each type is computed once, and cached
+"""
+swim_and_fly = Capability.classes_with(SwimmingMixin, FlyingMixin)
+assert WadingMixin not in Capability.classes_with(SwimmingMixin) and Duck in Capability.classes_with(SwimmingMixin)
+assert Goose in swim_and_fly and Seagull in swim_and_fly and Duck not in swim_and_fly
+assert SlottedGoose in swim_and_fly  # composed classes register like the others
+assert Goose().has(RunningMixin, PeckingMixin) and not Duck().has(FlyingMixin)
+zoo = [Duck(), Eagle(), 'duck', None, Seagull()]
+assert Capability.filter(zoo, SwimmingMixin) == Capability.filter(iter(zoo), SwimmingMixin) == [zoo[0], zoo[4]]
+# the cache of filter() does not keep classes alive: a class made at runtime goes away with its last instance
+Passing = type('Passing', (Animal, SwimmingMixin), {})
+assert Capability.filter([Passing()], SwimmingMixin) and Passing in Capability._type_masks
+del Passing
+gc.collect()
+assert not any(cls.__name__ == 'Passing' for cls in Capability._type_masks)
+try:
+    Capability.filter(zoo, Animal)
+except TypeError as e:
+    print(e)
+    """
+    Animal is not a capability
+    """
+
+# benchmark: keep the animals that swim and fly, out of a million objects of 8 types
+import random
+
+random.seed(0)
+TYPES = [Duck, Eagle, Goose, Chicken, Seagull, compose(Animal, SwimmingMixin, FlyingMixin), Animal, object]
+objects = [random.choice(TYPES)() for _ in range(1_000_000)]
+start = time.perf_counter()
+expected = [obj for obj in objects if isinstance(obj, SwimmingMixin) and isinstance(obj, FlyingMixin)]
+isinstance_seconds = time.perf_counter() - start
+start = time.perf_counter()
+assert [obj for obj in objects if hasattr(obj, 'swim') and hasattr(obj, 'fly')] == expected
+hasattr_seconds = time.perf_counter() - start
+start = time.perf_counter()
+assert Capability.filter(objects, SwimmingMixin, FlyingMixin) == expected
+filter_seconds = time.perf_counter() - start
+print(f'swim and fly: isinstance {isinstance_seconds * 1e3:.0f} ms, hasattr {hasattr_seconds * 1e3:.0f} ms, '
+      f'Capability.filter {filter_seconds * 1e3:.0f} ms')
+# and all of the 4 capabilities (only the geese)
+start = time.perf_counter()
+expected = [obj for obj in objects if isinstance(obj, SwimmingMixin) and isinstance(obj, FlyingMixin)
+            and isinstance(obj, RunningMixin) and isinstance(obj, PeckingMixin)]
+isinstance_seconds = time.perf_counter() - start
+start = time.perf_counter()
+assert Capability.filter(objects, SwimmingMixin, FlyingMixin, RunningMixin, PeckingMixin) == expected
+filter_seconds = time.perf_counter() - start
+print(f'all 4: isinstance {isinstance_seconds * 1e3:.0f} ms, Capability.filter {filter_seconds * 1e3:.0f} ms')
+"""
+swim and fly: isinstance 42 ms, hasattr 59 ms, Capability.filter 40 ms
+all 4: isinstance 53 ms, Capability.filter 33 ms
+"""
+# isinstance() on such short MROs is already fast, and stops at the first "False": the gain of the masks grows
+# with the number of capabilities asked for (one dict lookup per object, however many there are), and with the
+# depth of the hierarchies (isinstance walks the MRO, the mask of a type is computed once)
@@ -133,18 +133,66 @@ assert singleton_instance_1 is singleton_instance_2
 
 
 # The above SingletonClass that bases on the CommonClass can be changed to decorator
-def singleton_decorator(cls):
-    _singleton_object = None
+# a first attempt would be:
+#     def singleton_decorator(cls):
+#         _singleton_object = None
+#         @wraps
+#         def get_new_object(*args, **kwargs):
+#             with threading.Lock():
+#                 nonlocal _singleton_object
+#                 if not _singleton_object:
+#                     _singleton_object = cls.__new__(cls, *args, **kwargs)
+#             return _singleton_object
+#         return get_new_object
+# but it has three problems:
+# - threading.Lock() makes a new lock on every call, no two threads ever wait for the same lock, so two threads
+#   can both see "not _singleton_object" and both construct an object
+# - @wraps needs the wrapped object as argument (@wraps(cls)), and cls.__new__ skips __init__ entirely
+# - even with a shared lock, every access would take it, although it is only needed until the object exists
+# the registry below keeps one lock per class and uses double-checked locking: once the object exists,
+# the accessor is a plain dict lookup; the lock (and the second check) is only reached while it is being built
+class SingletonRegistry:
+    def __init__(self):
+        self._instances = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+
+    def _lock_for(self, cls):
+        lock = self._locks.get(cls)
+        if lock is None:
+            with self._registry_lock:
+                lock = self._locks.setdefault(cls, threading.Lock())
+        return lock
+
+    def get(self, cls, *args, **kwargs):
+        try:
+            return self._instances[cls]  # fast path, no lock
+        except KeyError:
+            pass
+        with self._lock_for(cls):
+            if cls not in self._instances:  # second check, another thread may have built it while we waited
+                # cls(...) runs __new__ and __init__ exactly once
+                self._instances[cls] = cls(*args, **kwargs)
+            return self._instances[cls]
+
+    def singleton(self, cls):
+        instances = self._instances
 
-    @wraps
-    def get_new_object(*args, **kwargs):
-        with threading.Lock():  # lock acquired to ensure thread safety
-            nonlocal _singleton_object
-            if not _singleton_object:
-                _singleton_object = cls.__new__(cls, *args, **kwargs)
-        return _singleton_object
+        @wraps(cls, updated=())  # updated=() so that the class __dict__ is not copied into the function
+        def get_instance(*args, **kwargs):
+            try:
+                return instances[cls]
+            except KeyError:
+                return self.get(cls, *args, **kwargs)
 
-    return get_new_object
+        return get_instance
+
+
+singleton_registry = SingletonRegistry()
+
+
+def singleton_decorator(cls):
+    return singleton_registry.singleton(cls)
 
 
 @singleton_decorator
@@ -155,3 +203,316 @@ class DecoratedCommonClass:
 
 
 assert DecoratedCommonClass() is DecoratedCommonClass()
+assert DecoratedCommonClass.__name__ == 'DecoratedCommonClass'
+assert isinstance(DecoratedCommonClass(), DecoratedCommonClass.__wrapped__)
+print("*"*20)
+
+
+# stress benchmark: 64 threads start at the same time and race for an object with a slow __init__
+import time
+
+STRESS_THREADS = 64
+STRESS_CALLS = 20_000
+
+
+@singleton_decorator
+class SlowToBuild:
+    constructed = 0
+
+    def __init__(self):
+        type(self).constructed += 1
+        time.sleep(0.05)  # widen the window in which other threads see "not constructed yet"
+
+
+stress_barrier = threading.Barrier(STRESS_THREADS)
+stress_results = [None] * STRESS_THREADS
+
+
+def stress_worker(index):
+    stress_barrier.wait()
+    first = SlowToBuild()
+    for _ in range(STRESS_CALLS):
+        SlowToBuild()
+    stress_results[index] = first
+
+
+stress_threads = [threading.Thread(target=stress_worker, args=(i,)) for i in range(STRESS_THREADS)]
+start = time.perf_counter()
+for t in stress_threads:
+    t.start()
+for t in stress_threads:
+    t.join()
+elapsed = time.perf_counter() - start
+
+assert SlowToBuild.__wrapped__.constructed == 1
+assert all(obj is stress_results[0] for obj in stress_results)
+print(f'{STRESS_THREADS} threads: {SlowToBuild.__wrapped__.constructed} construction, '
+      f'{STRESS_THREADS * STRESS_CALLS / elapsed / 1e6:.2f}M accesses/s (including the 50 ms construction)')
+"""
+64 threads: 1 construction, 4.92M accesses/s (including the 50 ms construction)
+"""
+print("*"*20)
+
+
+# The SingletonClass keeps exactly one object in _singleton_object, forever.
+# A multiton intercepts __new__ the same way, but keeps one object per key (the constructor arguments):
+# Connection('db1', 5432) returns the same object every time, Connection('db2', 5432) another one.
+# To keep the memory bounded when the keys keep changing, the pool
+# - has a maximum size and evicts the least recently used object (an OrderedDict, like functools.lru_cache)
+# - or, with weak=True, only keeps weak references, so an object is dropped as soon as nobody else uses it
+# The pool is configured per class with class keywords: class Connection(MultitonClass, maxsize=64, weak=False)
+import weakref
+from collections import OrderedDict, namedtuple
+
+PoolInfo = namedtuple('PoolInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+
+class MultitonClass:
+    def __init_subclass__(cls, maxsize=128, weak=False, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._pool = weakref.WeakValueDictionary() if weak else OrderedDict()
+        cls._pool_maxsize = None if weak else maxsize
+        cls._pool_lock = threading.Lock()
+        cls._pool_building = {}  # key -> lock held by the thread that builds the object of the key
+        cls._pool_hits = cls._pool_misses = cls._pool_evictions = 0
+        # Python calls __init__ on whatever __new__ returns, so a pooled object would be initialized again
+        # on every hit (as SingletonClass is); the wrapper makes __init__ run only for a new object.
+        # __new__ runs it itself, before the object goes into the pool, so no other thread sees it half-built
+        init = cls.__dict__.get('__init__')
+        if init is not None:
+            @wraps(init)
+            def __init__(self, *args, **kwargs):
+                if getattr(self, '_pool_initialized', None) is not type(self):
+                    init(self, *args, **kwargs)
+                    self._pool_initialized = type(self)
+
+            __init__.pool_wrapped = True
+            cls.__init__ = __init__
+
+    def __new__(cls, *args, **kwargs):
+        key = (args, frozenset(kwargs.items())) if kwargs else args
+        pool = cls._pool
+        # the pool lock protects the pool and the counters, it is not held while __init__ runs: a new key is
+        # built under a lock of its own, so the threads asking for other keys are not blocked meanwhile
+        with cls._pool_lock:
+            obj = pool.get(key)
+            if obj is not None:
+                cls._pool_hits += 1
+                if cls._pool_maxsize is not None:
+                    pool.move_to_end(key)
+                return obj
+            building = cls._pool_building.setdefault(key, threading.Lock())
+        with building:
+            with cls._pool_lock:  # another thread may have built it while this one waited
+                obj = pool.get(key)
+                if obj is not None:
+                    cls._pool_hits += 1
+                    if cls._pool_maxsize is not None:
+                        pool.move_to_end(key)
+                    return obj
+                cls._pool_misses += 1
+            try:
+                obj = super().__new__(cls)
+                if getattr(cls.__init__, 'pool_wrapped', False):
+                    obj.__init__(*args, **kwargs)
+                with cls._pool_lock:
+                    pool[key] = obj
+                    if cls._pool_maxsize is not None and len(pool) > cls._pool_maxsize:
+                        pool.popitem(last=False)
+                        cls._pool_evictions += 1
+            finally:
+                with cls._pool_lock:
+                    cls._pool_building.pop(key, None)
+        return obj
+
+    @classmethod
+    def pool_info(cls):
+        return PoolInfo(cls._pool_hits, cls._pool_misses, cls._pool_evictions, cls._pool_maxsize, len(cls._pool))
+
+    @classmethod
+    def pool_clear(cls):
+        with cls._pool_lock:
+            cls._pool.clear()
+            cls._pool_hits = cls._pool_misses = cls._pool_evictions = 0
+
+
+class Connection(MultitonClass, maxsize=3):
+    opened = 0
+
+    def __init__(self, host, port=5432):
+        type(self).opened += 1  # stands for an expensive connect()
+        self.host = host
+        self.port = port
+
+
+c1 = Connection('db1')
+c2 = Connection('db2', port=6432)
+assert Connection('db1') is c1 and Connection('db2', port=6432) is c2
+assert Connection('db2', 6432) is not c2  # the key is the arguments as written
+assert Connection.opened == 3  # __init__ ran once per key, not once per call
+print(f'{Connection.pool_info()=}')
+"""
+Connection.pool_info()=PoolInfo(hits=2, misses=3, evictions=0, maxsize=3, currsize=3)
+"""
+
+# under key churn, the pool stays at maxsize and the least recently used keys are evicted
+assert Connection('db1') is c1  # db1 is now the most recently used
+for i in range(1_000):
+    Connection(f'host-{i}')
+print(f'{Connection.pool_info()=}')
+"""
+Connection.pool_info()=PoolInfo(hits=3, misses=1003, evictions=1000, maxsize=3, currsize=3)
+"""
+assert Connection('db1') is not c1  # db1 was evicted as well, a new object is built
+
+
+# many threads asking for the same new key at once: one of them builds it, the others wait for it,
+# and none of them gets the object before its __init__ has returned
+class SlowConnection(MultitonClass):
+    opened = 0
+
+    def __init__(self, host):
+        time.sleep(0.05)  # a slow connect()
+        type(self).opened += 1
+        self.host = host
+
+
+connections = []
+connect_threads = [threading.Thread(target=lambda: connections.append(SlowConnection('db1'))) for _ in range(8)]
+for t in connect_threads:
+    t.start()
+for t in connect_threads:
+    t.join()
+assert SlowConnection.opened == 1
+assert all(c is connections[0] and c.host == 'db1' for c in connections)
+assert SlowConnection.pool_info()[:2] == (7, 1)  # 7 hits, 1 miss
+
+
+# weak mode: the pool never keeps an object alive by itself
+class WeakConnection(MultitonClass, weak=True):
+    def __init__(self, host):
+        self.host = host
+
+
+w1 = WeakConnection('db1')
+assert WeakConnection('db1') is w1
+for i in range(1_000):
+    WeakConnection(f'host-{i}')  # dropped right away (CPython frees it when the last reference goes)
+print(f'{WeakConnection.pool_info()=}')
+"""
+WeakConnection.pool_info()=PoolInfo(hits=1, misses=1001, evictions=0, maxsize=None, currsize=1)
+"""
+del w1
+assert WeakConnection.pool_info().currsize == 0
+print("*"*20)
+
+
+# All the singletons above are built in the process that first asks for them, and they are kept forever.
+# With os.fork (the default start method of multiprocessing on Linux), every child gets a copy of the parent's
+# memory, including the singleton object: its locks may be copied in the locked state, its sockets and file
+# handles are shared with the parent, and nothing tells the child that the object is stale.
+# A lazy, fork-safe singleton fixes both ends:
+# - it is a proxy that builds the object (runs __init__) on the first attribute access, not at import time,
+#   so a singleton that is never used is never built
+# - os.register_at_fork(after_in_child=...) drops the copied object and lock in every child,
+#   so each child builds its own object on first use
+# Calling the decorated name returns the one object, like the other singletons above.
+# Only plain attribute access is forwarded: dunder protocols (len(), iteration, with, ==, ...) look the method up
+# on the proxy's type and bypass __getattr__, so use .get() for those.
+import os
+
+
+class LazySingleton:
+    __slots__ = ('_factory', '_args', '_kwargs', '_obj', '_lock', '__weakref__')
+    _all = weakref.WeakSet()
+
+    def __init__(self, factory, *args, **kwargs):
+        object.__setattr__(self, '_factory', factory)
+        object.__setattr__(self, '_args', args)
+        object.__setattr__(self, '_kwargs', kwargs)
+        object.__setattr__(self, '_obj', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+        LazySingleton._all.add(self)
+
+    def get(self):
+        obj = self._obj
+        if obj is None:
+            with self._lock:
+                if self._obj is None:
+                    object.__setattr__(self, '_obj', self._factory(*self._args, **self._kwargs))
+                obj = self._obj
+        return obj
+
+    def __call__(self):
+        return self.get()
+
+    @property
+    def is_built(self):
+        return self._obj is not None
+
+    def __getattr__(self, item):
+        return getattr(self.get(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self.get(), key, value)
+
+    def _reset_after_fork(self):
+        object.__setattr__(self, '_obj', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+
+def _reset_lazy_singletons():
+    for lazy_singleton in list(LazySingleton._all):
+        lazy_singleton._reset_after_fork()
+
+
+os.register_at_fork(after_in_child=_reset_lazy_singletons)
+
+
+def fork_safe_singleton(cls):
+    return LazySingleton(cls)
+
+
+@fork_safe_singleton
+class NeverUsedResource:
+    def __init__(self):
+        time.sleep(1)  # an expensive set-up that nobody needs in this run
+
+
+@fork_safe_singleton
+class ProcessLocalResource:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+
+
+assert not NeverUsedResource.is_built  # the decorated class is not built at import time
+assert not ProcessLocalResource.is_built
+assert ProcessLocalResource.pid == os.getpid()  # the first attribute access builds it
+assert ProcessLocalResource.is_built
+assert ProcessLocalResource() is ProcessLocalResource() is ProcessLocalResource.get()
+ProcessLocalResource.lock.acquire()  # the worst case: the parent holds the lock while forking
+
+
+def process_local_resource_info(_):
+    with ProcessLocalResource.lock:  # would dead-lock on a stale copy of the parent's lock
+        time.sleep(0.01)  # give every worker a share of the tasks
+        return os.getpid(), ProcessLocalResource.pid, id(ProcessLocalResource.get())
+
+
+import multiprocessing
+
+with multiprocessing.get_context('fork').Pool(4) as process_pool:
+    resource_infos = process_pool.map(process_local_resource_info, range(64), chunksize=1)
+ProcessLocalResource.lock.release()
+
+objects_per_worker = {}
+for worker_pid, resource_pid, resource_id in resource_infos:
+    assert resource_pid == worker_pid != os.getpid()  # built in the worker, not copied from the parent
+    objects_per_worker.setdefault(worker_pid, set()).add(resource_id)
+assert all(len(ids) == 1 for ids in objects_per_worker.values())  # and exactly once per worker
+print(f'{len(objects_per_worker)} workers, one ProcessLocalResource each')
+"""
+4 workers, one ProcessLocalResource each
+"""
+assert not NeverUsedResource.is_built
@@ -32,3 +32,198 @@ print(retval_of_gen_func)
 assert isinstance(retval_of_gen_func, collections.abc.Generator) is True
 
 print(list(retval_of_gen_func))
+
+
+# (3) Fused pipelines
+# generators can be chained, each stage reading from the one before:
+#     (y * 3 for y in (x + 1 for x in range(n) if not x % 2))
+# every element then resumes one generator frame per stage. A lazy Pipeline only records the stages, and when it
+# is iterated, it compiles all of them into ONE generator function (like the generated __init__ of dataclasses):
+#     for x in source:
+#         if f0(x):
+#             x = f1(x)
+#             x = f2(x)
+#             yield x
+# so an element costs one frame resume in total, plus the calls of the stage functions themselves.
+# On a range source, some stages need no loop at all and are folded into the range before compiling:
+# - filter(divisible_by(k, r)) keeps every (k / gcd(step, k))-th number, that is a range with a larger step,
+#   e.g. Pipeline(range(10)).filter(is_even) is range(0, 10, 2)
+# - take(n) is a slice of the range
+import math
+import time
+
+
+class divisible_by:
+    """The predicate x % k == remainder, which a Pipeline can recognize on a range source."""
+
+    def __init__(self, k, remainder=0):
+        if not k:
+            raise ValueError('divisible_by() needs a non-zero k')
+        # x % -k == r % -k keeps the same numbers as x % k == r % k, only the positive k is kept
+        self.k = abs(k)
+        self.remainder = remainder % self.k
+
+    def __call__(self, x):
+        return x % self.k == self.remainder
+
+    def __repr__(self):
+        return f'divisible_by({self.k}, {self.remainder})'
+
+
+is_even = divisible_by(2)
+
+
+def _filter_range(numbers, predicate):
+    period = predicate.k // math.gcd(numbers.step, predicate.k)
+    for i in range(min(period, len(numbers))):
+        if predicate(numbers[i]):
+            return numbers[i::period]
+    return numbers[0:0]
+
+
+class Pipeline:
+    def __init__(self, source, stages=()):
+        self.source = source
+        self.stages = tuple(stages)
+        self._compiled = None  # (planned source, fused generator function or None), made on the first iteration
+
+    def map(self, func):
+        return Pipeline(self.source, self.stages + (('map', func),))
+
+    def filter(self, predicate):
+        return Pipeline(self.source, self.stages + (('filter', predicate),))
+
+    def take(self, n):
+        return Pipeline(self.source, self.stages + (('take', n),))
+
+    def plan(self):
+        """Fold the leading stages that a range source can do by itself, return (source, remaining stages)."""
+        source, stages = self.source, list(self.stages)
+        while isinstance(source, range) and stages:
+            kind, arg = stages[0]
+            if kind == 'filter' and isinstance(arg, divisible_by):
+                source = _filter_range(source, arg)
+            elif kind == 'take':
+                source = source[:max(arg, 0)]
+            else:
+                break
+            del stages[0]
+        return source, stages
+
+    @staticmethod
+    def _compile(stages):
+        namespace, header, body, closing, indent = {}, ['def fused(source):'], [], [], '        '
+        for i, (kind, arg) in enumerate(stages):
+            if kind == 'map':
+                namespace[f'f{i}'] = arg
+                body.append(f'{indent}x = f{i}(x)')
+            elif kind == 'filter':
+                namespace[f'f{i}'] = arg
+                body.append(f'{indent}if f{i}(x):')
+                indent += '    '
+            elif arg <= 0:
+                header.append('    return')
+            else:
+                # take: count the elements that reach this stage, and stop once the n-th has gone through
+                # all the later stages, so the source is not read one element too far
+                header.append(f'    taken{i} = 0')
+                body.append(f'{indent}taken{i} += 1')
+                closing.append(f'{indent}if taken{i} == {arg}: return')
+        body.append(f'{indent}yield x')
+        source_code = '\n'.join(header + ['    for x in source:'] + body + closing[::-1]) + '\n'
+        exec(source_code, namespace)
+        namespace['fused'].__source__ = source_code
+        return namespace['fused']
+
+    def __iter__(self):
+        if self._compiled is None:
+            source, stages = self.plan()
+            self._compiled = source, self._compile(stages) if stages else None
+        source, fused = self._compiled
+        return iter(source) if fused is None else fused(source)
+
+
+# the even numbers of (1) and (2), without a loop at all
+assert Pipeline(range(upper_bound)).filter(is_even).plan() == (range(0, upper_bound, 2), [])
+assert list(Pipeline(range(upper_bound)).filter(is_even)) == list(even_number_generator_function(upper_bound))
+assert Pipeline(range(100)).filter(divisible_by(3, 1)).filter(is_even).take(4).plan() == (range(4, 100, 6)[:4], [])
+assert list(Pipeline(range(10)).filter(divisible_by(-2))) == [x for x in range(10) if x % -2 == 0] == [0, 2, 4, 6, 8]
+assert list(Pipeline(range(10)).filter(divisible_by(-3, 2))) == [x for x in range(10) if x % -3 == 2 % -3]
+
+# other stages are fused into one generator
+fused_pipeline = Pipeline(range(upper_bound)).filter(is_even).map(lambda x: x + 1).filter(lambda x: x % 3).take(2)
+assert list(fused_pipeline) == [x for x in (x + 1 for x in range(upper_bound) if not x % 2) if x % 3][:2]
+print(Pipeline._compile(fused_pipeline.plan()[1]).__source__)
+"""
+def fused(source):
+    taken2 = 0
+    for x in source:
+        x = f0(x)
+        if f1(x):
+            taken2 += 1
+            yield x
+            if taken2 == 2: return
+"""
+# take() stops the loop as soon as its n-th element has gone through, the source is not read any further
+consumed = []
+assert list(Pipeline(iter(range(100))).map(lambda x: consumed.append(x) or x).take(3)) == [0, 1, 2]
+assert consumed == [0, 1, 2]
+# the stages are compiled once per Pipeline, every iteration reuses the generator function
+compiled = fused_pipeline._compiled
+assert list(fused_pipeline) == [1, 5] and fused_pipeline._compiled is compiled
+
+
+# benchmark: chains of 3, 5 and 10 stages, as nested generator expressions and as a fused Pipeline
+# (the same stage functions in both, alternately a map and a filter that keeps 2 numbers out of 3)
+def add_one(x):
+    return x + 1
+
+
+def not_divisible_by_3(x):
+    return x % 3
+
+
+PIPELINE_N = 1_000_000
+
+
+def nested_genexprs(numbers, n_stages):
+    for i in range(n_stages):
+        if i % 2:
+            numbers = (x for x in numbers if not_divisible_by_3(x))
+        else:
+            numbers = (add_one(x) for x in numbers)
+    return numbers
+
+
+def fused_pipeline_of(numbers, n_stages):
+    pipeline = Pipeline(numbers)
+    for i in range(n_stages):
+        pipeline = pipeline.filter(not_divisible_by_3) if i % 2 else pipeline.map(add_one)
+    return pipeline
+
+
+for n_stages in (3, 5, 10):
+    start = time.perf_counter()
+    expected = sum(nested_genexprs(range(PIPELINE_N), n_stages))
+    nested_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    assert sum(fused_pipeline_of(range(PIPELINE_N), n_stages)) == expected
+    fused_seconds = time.perf_counter() - start
+    print(f'{n_stages:>2} stages: nested genexprs {nested_seconds * 1e3:.0f} ms, fused {fused_seconds * 1e3:.0f} ms')
+
+# and the even numbers of a range, where the filter becomes the step of the range
+start = time.perf_counter()
+expected = sum(x + 1 for x in range(PIPELINE_N) if not x % 2)
+genexpr_seconds = time.perf_counter() - start
+start = time.perf_counter()
+assert sum(Pipeline(range(PIPELINE_N)).filter(is_even).map(add_one)) == expected
+fused_seconds = time.perf_counter() - start
+print(f'even numbers + 1: genexpr {genexpr_seconds * 1e3:.0f} ms, range(0, n, 2) + fused map {fused_seconds * 1e3:.0f} ms')
+"""
+ 3 stages: nested genexprs 136 ms, fused 124 ms
+ 5 stages: nested genexprs 179 ms, fused 161 ms
+10 stages: nested genexprs 181 ms, fused 153 ms
+even numbers + 1: genexpr 45 ms, range(0, n, 2) + fused map 34 ms
+"""
+# fusing saves the frame resumes between stages (10-20% here), the calls of the stage functions stay:
+# most of the time goes to them. Folding the filter into the range skips half of the numbers without any call.
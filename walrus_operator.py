@@ -15,20 +15,34 @@ assert x == 0 and y == 0
 # here are some changes to old python code:
 
 # (1) reading files
+# (the demo file is written to a temporary directory, which is removed when the interpreter exits)
+import os
+import tempfile
+
+workdir = tempfile.TemporaryDirectory()
+demo_path = os.path.join(workdir.name, 'some.file')
+with open(demo_path, 'w') as f:
+    f.write('first line\nsecond line\nthird line\n')
+
 # before walrus
-with open("some.file", "r") as f:
+lines_before = []
+with open(demo_path, "r") as f:
     while True:
         line = f.readline()
         if not line:
             break
         # processing the line content
+        lines_before.append(line)
         continue
 
 # after walrus
-with open("some.file", "r") as f:
+lines_after = []
+with open(demo_path, "r") as f:
     while line := f.readline():
         # processing the line content
+        lines_after.append(line)
         continue
+assert lines_before == lines_after == ['first line\n', 'second line\n', 'third line\n']
 
 
 # (2) get value and decide
@@ -49,3 +63,281 @@ def build(material):
 
 print([build(_) for _ in ['wood', 'steel', 'coal']])
 
+
+
+# (3) reading big files fast
+# the readline loop of (1) makes one call, and creates one str, per line. For files of several GB, it is faster to
+# read big buffers and split each of them on b'\n' at once: bytes.split() runs in C and builds every line in one go.
+# - fast_lines() reads chunk_size bytes at a time, keeps the unfinished last line for the next chunk, and decodes
+#   a whole chunk at once when an encoding is given (it must be ASCII-compatible, like utf-8 or latin-1, so that a
+#   b'\n' byte is always a newline). Unlike readline(), the lines come without their '\n', like str.splitlines()
+# - mmap_lines() maps the file into memory and yields memoryview slices of the mapping, no line is ever copied
+# - line_aligned_ranges() cuts a file into byte ranges that begin and end on line boundaries, so that every
+#   (start, end) can be read by another worker (e.g. with parallel_map of the "iterator_protocol" chapter)
+import mmap
+import time
+
+
+def fast_lines(path, encoding=None, chunk_size=1 << 20, start=0, end=None):
+    """Yield the lines of the bytes [start, end) of path, as bytes, or as str if an encoding is given."""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = -1 if end is None else end - start
+        tail = b''
+        while remaining:
+            chunk = f.read(chunk_size if remaining < 0 else min(chunk_size, remaining))
+            if not chunk:
+                break
+            if remaining > 0:
+                remaining -= len(chunk)
+            if (cut := chunk.rfind(b'\n')) < 0:  # no complete line in this chunk
+                tail += chunk
+                continue
+            complete, tail = tail + chunk[:cut], chunk[cut + 1:]
+            if encoding:
+                yield from complete.decode(encoding).split('\n')
+            else:
+                yield from complete.split(b'\n')
+        if tail:
+            yield tail.decode(encoding) if encoding else tail
+
+
+def mmap_lines(path, start=0, end=None):
+    """
+    Yield the lines of the bytes [start, end) of path as memoryview slices of a memory map of the file.
+    The views are valid until the generator is closed, use bytes(view) to keep a line.
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:  # an empty file cannot be mapped
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mapped)
+    end = len(mapped) if end is None else end
+    find = mapped.find
+    try:
+        while start < end:
+            if (stop := find(b'\n', start, end)) < 0:
+                stop = end
+            yield view[start:stop]
+            start = stop + 1
+    finally:
+        view.release()
+        try:
+            mapped.close()
+        except BufferError:  # the consumer still holds some views, the map is closed when they are collected
+            pass
+
+
+def line_aligned_ranges(path, parts):
+    """Split path into at most `parts` (start, end) byte ranges, each of them made of whole lines."""
+    size = os.path.getsize(path)
+    starts = [0]
+    with open(path, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts - 1, starts[-1]))
+            f.readline()  # move to the start of the next line
+            if (position := f.tell()) >= size:
+                break
+            if position > starts[-1]:
+                starts.append(position)
+    return list(zip(starts, starts[1:] + [size]))
+
+
+# without a trailing newline too, and with lines longer than a chunk
+with open(demo_path, 'ab') as f:
+    f.write(('x' * 100 + '\nünïcödé\nno newline at the end').encode('utf-8'))
+expected = open(demo_path, encoding='utf-8').read().split('\n')
+assert list(fast_lines(demo_path, 'utf-8', chunk_size=16)) == expected
+assert [line.decode('utf-8') for line in fast_lines(demo_path, chunk_size=7)] == expected
+assert [bytes(view).decode('utf-8') for view in mmap_lines(demo_path)] == expected
+for parts in (1, 2, 3, 7, 100):
+    ranges = line_aligned_ranges(demo_path, parts)
+    assert ranges[0][0] == 0 and ranges[-1][1] == os.path.getsize(demo_path) and len(ranges) <= parts
+    assert [line for start, end in ranges for line in fast_lines(demo_path, 'utf-8', 5, start, end)] == expected
+    assert [bytes(v).decode() for start, end in ranges for v in mmap_lines(demo_path, start, end)] == expected
+
+# benchmark: count the lines and their characters in a file of 2 million log-like lines
+BENCHMARK_PATH = os.path.join(workdir.name, 'big.log')
+with open(BENCHMARK_PATH, 'w') as f:
+    f.writelines(f'2024-01-01 12:00:{i % 60:02} INFO worker-{i % 8} processed request {i}\n'
+                 for i in range(2_000_000))
+size_mb = os.path.getsize(BENCHMARK_PATH) / 2 ** 20
+
+
+def readline_loop(path):
+    count = total = 0
+    with open(path, 'r') as f:
+        while line := f.readline():
+            count += 1
+            total += len(line) - 1
+    return count, total
+
+
+def fast_lines_count(path, encoding=None):
+    count = total = 0
+    for line in fast_lines(path, encoding):
+        count += 1
+        total += len(line)
+    return count, total
+
+
+def mmap_lines_count(path):
+    count = total = 0
+    for view in mmap_lines(path):
+        count += 1
+        total += len(view)
+    return count, total
+
+
+expected = readline_loop(BENCHMARK_PATH)
+for name, read in [('readline loop (str)', readline_loop),
+                   ('fast_lines (bytes)', fast_lines_count),
+                   ('fast_lines (str)', lambda path: fast_lines_count(path, 'utf-8')),
+                   ('mmap_lines (memoryview)', mmap_lines_count)]:
+    start = time.perf_counter()
+    assert read(BENCHMARK_PATH) == expected
+    seconds = time.perf_counter() - start
+    print(f'{name:<24} {size_mb / seconds:6.0f} MB/s')
+"""
+readline loop (str)         339 MB/s
+fast_lines (bytes)          515 MB/s
+fast_lines (str)            423 MB/s
+mmap_lines (memoryview)     223 MB/s
+"""
+# the Python loop that handles each line costs about as much as reading it, so splitting in bulk is 1.2-1.5x faster
+# here, not more. mmap_lines() is slower per line (a find() and a slice per line, in Python), it pays off when the
+# lines are not copied at all (e.g. only some of them are parsed), and in the workers of line_aligned_ranges(),
+# which all share the pages of the same mapping instead of reading their own copies.
+
+
+# (4) deciding for a batch of materials
+# build() of (2) looks a material up, compares its number and formats a string, once per call. For millions of
+# materials, StockIndex keeps the decision itself up to date: every change of the stock also stores the tier of
+# the material (0: no product, 1: level_1, 2: level_2), so build_many() only looks the tiers up, in one map() call,
+# and formats nothing unless it is asked to.
+# adjust() changes a number and its tier under a lock, so concurrent updates are atomic (a "+=" on a dict is not:
+# another thread can run between the read and the write), and build_many() reads a consistent stock: it takes
+# the tiers (and the numbers) under the lock, and formats the strings after releasing it.
+import threading
+from collections.abc import MutableMapping
+from itertools import repeat
+
+
+class StockIndex(MutableMapping):
+    def __init__(self, items=(), **kwargs):
+        self._numbers = {}
+        self.tiers = {}  # read only, it follows the numbers
+        self._lock = threading.Lock()
+        self.update(items, **kwargs)
+
+    @staticmethod
+    def tier(number_of_stock):
+        if not number_of_stock:
+            return 0
+        return 1 if number_of_stock <= 10 else 2
+
+    def __getitem__(self, material):
+        return self._numbers[material]
+
+    def __setitem__(self, material, number_of_stock):
+        with self._lock:
+            self._numbers[material] = number_of_stock
+            self.tiers[material] = self.tier(number_of_stock)
+
+    def __delitem__(self, material):
+        with self._lock:
+            del self._numbers[material]
+            del self.tiers[material]
+
+    def __iter__(self):
+        return iter(self._numbers)
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self._numbers!r})'
+
+    def adjust(self, material, delta):
+        """Add delta (negative to take) to the stock of material, atomically, and return the new number."""
+        with self._lock:
+            number_of_stock = self._numbers.get(material, 0) + delta
+            if number_of_stock < 0:
+                raise ValueError(f'not enough {material}: {number_of_stock - delta} in stock, {-delta} needed')
+            self._numbers[material] = number_of_stock
+            self.tiers[material] = self.tier(number_of_stock)
+            return number_of_stock
+
+    def build_many(self, materials, formatted=False):
+        """The tiers of materials (0, 1 or 2), or the strings of build() if formatted."""
+        materials = list(materials)
+        with self._lock:
+            tiers = list(map(self.tiers.get, materials, repeat(0)))
+            if not formatted:
+                return tiers
+            numbers = list(map(self._numbers.get, materials))
+        return [f'{_PRODUCTS[tier]}{material}: {number}' if tier else 'no product'
+                for tier, material, number in zip(tiers, materials, numbers)]
+
+
+_PRODUCTS = {1: 'level_1 product, ', 2: 'level_2 product, '}
+# build() reads the global "stock" when it is called, so it now uses the index too
+stock = StockIndex(stock)
+
+
+materials = ['wood', 'steel', 'coal']
+assert stock.build_many(materials) == [1, 2, 0]
+assert stock.build_many(materials, formatted=True) == [build(_) for _ in materials]
+assert stock.build_many(iter(materials), formatted=True) == [build(_) for _ in materials]  # read only once
+stock.adjust('wood', 1)
+stock['coal'] = 0
+assert stock.build_many(materials) == [2, 2, 0]
+assert stock.build_many(materials, formatted=True) == [build(_) for _ in materials]
+try:
+    stock.adjust('coal', -1)
+except ValueError as e:
+    print(e)
+    """
+    not enough coal: 0 in stock, 1 needed
+    """
+
+
+# concurrent adjustments: 8 threads take and give back the same material, nothing is lost
+def take_and_give_back(material, times):
+    for _ in range(times):
+        stock.adjust(material, -1)
+        stock.adjust(material, 1)
+
+
+stock['steel'] = 8
+workers = [threading.Thread(target=take_and_give_back, args=('steel', 10_000)) for _ in range(8)]
+for worker in workers:
+    worker.start()
+for worker in workers:
+    worker.join()
+assert stock['steel'] == 8 and stock.tiers['steel'] == 1
+
+# benchmark: a batch of 1 million materials, out of 100 000 stock entries
+# (build() runs on a plain dict, a StockIndex would make each of its lookups a Python call of Mapping.get)
+stock_index = StockIndex({f'sku-{i}': i % 20 for i in range(100_000)})
+stock = dict(stock_index)
+batch = [f'sku-{i * 7 % 110_000}' for i in range(1_000_000)]  # some of them are not in stock
+start = time.perf_counter()
+built = [build(material) for material in batch]
+build_seconds = time.perf_counter() - start
+start = time.perf_counter()
+tiers = stock_index.build_many(batch)
+tiers_seconds = time.perf_counter() - start
+start = time.perf_counter()
+assert stock_index.build_many(batch, formatted=True) == built
+formatted_seconds = time.perf_counter() - start
+assert tiers == [StockIndex.tier(stock.get(material)) for material in batch]
+stock = stock_index
+print(f'build() per material {build_seconds * 1e3:.0f} ms, build_many() {tiers_seconds * 1e3:.0f} ms, '
+      f'build_many(formatted=True) {formatted_seconds * 1e3:.0f} ms')
+"""
+build() per material 267 ms, build_many() 77 ms, build_many(formatted=True) 325 ms
+"""
+# the formatting is most of the cost: the tiers alone are 3.5x faster than build(), while the formatted batch is
+# no faster than build() on a plain dict (it copies the numbers under the lock first), so skip the formatting
+# when only the decision is needed
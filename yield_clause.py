@@ -105,5 +105,420 @@ ave.send(None)  # send a None to stop average_gen(), it "return count" to proxy,
 # and received by "ret = yield", now "ret" is assigned with the retval ("count" in average_gen())
 
 
-# TODO: ----APPENDIX---------------------------------------
-# asyncio, yield from
+# (3) flatten without recursion
+# flatten() in (2.1) nests one generator per level: a leaf at depth d is passed up through d generator frames
+# (each "yield from" resumes its child and hands the value on), and a nesting deeper than the recursion limit
+# (about 1000) raises RecursionError.
+# flatten_iterative() keeps an explicit stack of iterators in one generator instead: a leaf is yielded once,
+# whatever its depth, and the depth is only limited by memory.
+# - is_leaf decides what is not to be flattened: a type or a tuple of types (int by default, like flatten()),
+#   checked inline with isinstance(), or any predicate function (one more Python call per item)
+# - flatten() raises RecursionError on a string that is not a leaf ('a' is made of 'a'); here the stack would grow
+#   forever instead, so a str that is not a leaf, or any iterable that yields itself, raises TypeError
+# there is no separate fast path for flat lists: a flat list never pushes anything, its items all go through the
+# same "for" loop (a check of all the items before a "yield from" was tried, it made the nested shapes slower)
+def _never_ending(sub_it):
+    return TypeError(f'cannot flatten {sub_it!r}, it yields itself (a str yields str): '
+                     f'make it a leaf with is_leaf')
+
+
+def _flatten_leaf_types(it, leaf_types):
+    if isinstance(it, leaf_types):
+        yield it
+        return
+    if isinstance(it, str):
+        raise _never_ending(it)
+    stack, containers = [iter(it)], [it]
+    while stack:
+        for sub_it in stack[-1]:
+            if isinstance(sub_it, leaf_types):
+                yield sub_it
+            else:
+                if sub_it is containers[-1] or isinstance(sub_it, str):
+                    raise _never_ending(sub_it)
+                stack.append(iter(sub_it))
+                containers.append(sub_it)
+                break
+        else:
+            stack.pop()
+            containers.pop()
+
+
+def _flatten_leaf_predicate(it, is_leaf):
+    if is_leaf(it):
+        yield it
+        return
+    if isinstance(it, str):
+        raise _never_ending(it)
+    stack, containers = [iter(it)], [it]
+    while stack:
+        for sub_it in stack[-1]:
+            if is_leaf(sub_it):
+                yield sub_it
+            else:
+                if sub_it is containers[-1] or isinstance(sub_it, str):
+                    raise _never_ending(sub_it)
+                stack.append(iter(sub_it))
+                containers.append(sub_it)
+                break
+        else:
+            stack.pop()
+            containers.pop()
+
+
+def flatten_iterative(it, is_leaf=int):
+    if isinstance(is_leaf, (type, tuple)):
+        return _flatten_leaf_types(it, is_leaf)
+    return _flatten_leaf_predicate(it, is_leaf)
+
+
+assert list(flatten_iterative(nested_iter)) == list(flatten(nested_iter)) == flatten_classical(nested_iter)
+assert list(flatten_iterative(7)) == [7] and list(flatten_iterative([[], [[]], 1])) == [1]
+# other leaves: strings would otherwise be iterated character by character (forever, 'a' is made of 'a')
+assert list(flatten_iterative(['ab', ['cd', ('ef',)]], is_leaf=str)) == ['ab', 'cd', 'ef']
+# a predicate: only lists are flattened, anything else is a leaf
+assert list(flatten_iterative([(1, 2), [3, [(4, 5)]]], is_leaf=lambda x: not isinstance(x, list))) \
+       == [(1, 2), 3, (4, 5)]
+for never_ending in [['ab'], ['中'], 'ab']:
+    try:
+        list(flatten_iterative(never_ending))
+    except TypeError as e:
+        assert 'yields itself' in str(e)
+    else:
+        raise AssertionError(f'{never_ending!r} was flattened')
+
+deep_iter = [1]
+for _ in range(10_000):
+    deep_iter = [deep_iter, 2]
+assert sum(flatten_iterative(deep_iter)) == 1 + 2 * 10_000
+try:
+    sum(flatten(deep_iter))
+except RecursionError as e:
+    print(f'flatten: {e}')
+
+
+# benchmark: wide (flat lists of ints), deep (nested 500 levels), mixed (random small nestings)
+import random
+import time
+
+random.seed(0)
+
+
+def random_nesting(depth):
+    if depth == 0 or random.random() < 0.3:
+        return random.randrange(100)
+    return [random_nesting(depth - 1) for _ in range(random.randrange(1, 5))]
+
+
+deep_500 = [0]
+for _ in range(500):
+    deep_500 = [deep_500, 1, 2]
+flatten_shapes = {
+    'wide': [list(range(1_000)) for _ in range(200)],
+    'deep': [deep_500] * 100,
+    'mixed': [random_nesting(8) for _ in range(3_000)],
+}
+for shape, data in flatten_shapes.items():
+    expected = flatten_classical(data)
+    timings = []
+    for flattener in [flatten_classical, lambda d: list(flatten(d)), lambda d: list(flatten_iterative(d))]:
+        start = time.perf_counter()
+        assert flattener(data) == expected
+        timings.append(time.perf_counter() - start)
+    print(f'{shape:5} ({len(expected)} leaves): flatten_classical {timings[0] * 1e3:6.1f} ms, '
+          f'flatten {timings[1] * 1e3:6.1f} ms, flatten_iterative {timings[2] * 1e3:6.1f} ms')
+
+"""
+flatten: maximum recursion depth exceeded
+wide  (200000 leaves): flatten_classical    9.7 ms, flatten   26.4 ms, flatten_iterative    5.9 ms
+deep  (100100 leaves): flatten_classical   12.9 ms, flatten  774.4 ms, flatten_iterative   14.2 ms
+mixed (347660 leaves): flatten_classical   47.0 ms, flatten  139.6 ms, flatten_iterative   66.2 ms
+"""
+# flatten_iterative is lazy like flatten, and close to flatten_classical which builds the whole list at once
+# (slower on the mixed shape, where most lists are small and each of them is pushed on the stack)
+
+# (4) a batch version of cipher_generator
+# cipher_generator takes one plaintext per send(): a Python call and a switch into the generator frame per value.
+# the offsets it uses follow a formula: the k-th non-zero plaintext (counting from 0) of a batch gets the offset
+# (offset + k) % mod, and zeros (falsy plaintexts) are skipped without moving the offset.
+# cipher_batch() applies that formula to a whole batch at once:
+# - filter(None, ...) drops the zeros, itertools.cycle() produces the offsets, map(operator.add) adds them, and
+#   array('q') stores the result: all of it runs in C, no Python code is executed per value
+# - with a NumPy array as input, the same formula is computed with vectorized NumPy operations
+# it returns the ciphertexts (the values cipher_generator prints) and the offset to continue from (the value the
+# generator yields after the last send), so batches can be chained and mixed with the generator.
+# the values must be ints that fit in 64 bits (array('q') raises TypeError / OverflowError otherwise)
+import contextlib
+import io
+import itertools
+import operator
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def cipher_batch(plaintexts, offset, mod):
+    offset %= mod  # any offset, negative or past mod, starts at the same place in the cycle
+    if numpy is not None and isinstance(plaintexts, numpy.ndarray):
+        kept = plaintexts[plaintexts != 0]
+        return kept + (offset + numpy.arange(len(kept))) % mod, (offset + len(kept)) % mod
+    kept = array('q', filter(None, plaintexts))
+    offsets = itertools.islice(itertools.cycle(range(mod)), offset, None)
+    return array('q', map(operator.add, kept, offsets)), (offset + len(kept)) % mod
+
+
+# the batch gives exactly what the generator prints, and the offset it yields after the batch
+random.seed(1)
+plaintexts = [random.choice([0, random.randrange(1, 100)]) for _ in range(1_000)]
+g = cipher_generator(7)
+with contextlib.redirect_stdout(io.StringIO()) as printed:
+    g.send(None)
+    generator_offset = g.send(5)  # continue from the middle of a stream
+    for pt in plaintexts:
+        generator_offset = g.send(pt)
+generator_ciphertexts = [int(line.removeprefix('cipher=')) for line in printed.getvalue().split()][1:]
+batch_ciphertexts, batch_offset = cipher_batch(plaintexts, offset=1, mod=7)
+assert list(batch_ciphertexts) == generator_ciphertexts and batch_offset == generator_offset
+
+# batches chain through the returned offset
+first_half, half_offset = cipher_batch(plaintexts[:500], offset=1, mod=7)
+second_half, end_offset = cipher_batch(plaintexts[500:], offset=half_offset, mod=7)
+assert list(first_half) + list(second_half) == generator_ciphertexts and end_offset == batch_offset
+assert cipher_batch(plaintexts, offset=1 - 7, mod=7) == cipher_batch(plaintexts, offset=1 + 7 * 10**12, mod=7)
+assert list(cipher_batch(plaintexts, offset=-6, mod=7)[0]) == generator_ciphertexts
+
+
+# benchmark: values per second, the generator (its prints sent to a buffer) against the batch
+generator_plaintexts = plaintexts * 100
+g = cipher_generator(7)
+g.send(None)
+start = time.perf_counter()
+with contextlib.redirect_stdout(io.StringIO()):
+    for pt in generator_plaintexts:
+        g.send(pt)
+generator_rate = len(generator_plaintexts) / (time.perf_counter() - start)
+batch_plaintexts = array('q', plaintexts * 10_000)
+start = time.perf_counter()
+cipher_batch(batch_plaintexts, 0, 7)
+batch_rate = len(batch_plaintexts) / (time.perf_counter() - start)
+print(f'cipher_generator {generator_rate / 1e6:.2f}M values/s, cipher_batch {batch_rate / 1e6:.1f}M values/s')
+"""
+cipher_generator 2.96M values/s, cipher_batch 15.2M values/s
+"""
+# (without NumPy; with a NumPy array as input the batch runs at NumPy speed)
+
+# (5) streaming statistics
+# average_gen in (2.2) stops on the first falsy value it receives, so a legitimate sample 0 ends the stream,
+# and it only knows the mean. The aggregators below keep constant memory and follow the same protocol:
+# - prime with send(None), each send() returns the current result, the return value is the final result
+# - a send() takes one sample or a whole batch (any iterable of samples), so a batch costs one switch
+# - the stream ends only with the explicit END_OF_STREAM sentinel, 0, None-like or empty values are samples
+# and they compose through a delegating (proxy) generator like average_proxy_gen
+import bisect
+import math
+import statistics
+from collections import namedtuple
+from numbers import Number
+
+END_OF_STREAM = object()
+MeanVariance = namedtuple('MeanVariance', ['count', 'mean', 'variance'])
+
+
+def _samples(recv):
+    return (recv,) if isinstance(recv, Number) else recv
+
+
+def welford_gen():
+    # Welford's online algorithm: the mean and the sum of squared deviations are updated per sample,
+    # numerically stable, unlike sum(x*x) - sum(x)**2 / n
+    count, mean, m2 = 0, 0.0, 0.0
+    while True:
+        recv = yield MeanVariance(count, mean, m2 / (count - 1) if count > 1 else 0.0)
+        if recv is END_OF_STREAM:
+            break
+        for x in _samples(recv):
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+    return MeanVariance(count, mean, m2 / (count - 1) if count > 1 else 0.0)
+
+
+def _compensated_add(total, compensation, x):
+    # Neumaier's summation: compensation collects the low-order bits that total + x loses
+    new_total = total + x
+    if abs(total) >= abs(x):
+        compensation += (total - new_total) + x
+    else:
+        compensation += (x - new_total) + total
+    return new_total, compensation
+
+
+def window_mean_gen(size):
+    # mean of the last "size" samples, in a ring buffer with a running total.
+    # adding the new sample and subtracting the old one loses bits on every step (after 1e16, a 1 is lost),
+    # and the error would add up forever in a long-lived aggregator: the total is compensated, and computed
+    # again exactly from the ring with math.fsum() every "size" samples, so the error never outlives the window
+    ring = [0.0] * size
+    index, filled, total, compensation = 0, 0, 0.0, 0.0
+    while True:
+        recv = yield (total + compensation) / filled if filled else 0.0
+        if recv is END_OF_STREAM:
+            break
+        for x in _samples(recv):
+            total, compensation = _compensated_add(total, compensation, x)
+            total, compensation = _compensated_add(total, compensation, -ring[index])
+            ring[index] = x
+            index = (index + 1) % size
+            filled = min(filled + 1, size)
+            if not index:
+                total, compensation = math.fsum(ring), 0.0
+    return (total + compensation) / filled if filled else 0.0
+
+
+def minmax_gen():
+    low = high = None
+    while True:
+        recv = yield low, high
+        if recv is END_OF_STREAM:
+            break
+        for x in _samples(recv):
+            if low is None or x < low:
+                low = x
+            if high is None or x > high:
+                high = x
+    return low, high
+
+
+def p2_quantile_gen(p=0.5):
+    # the P-square algorithm (Jain & Chlamtac, 1985): five markers (min, p/2, p, (1+p)/2 quantiles and max)
+    # whose heights are adjusted with a piecewise-parabolic formula as samples arrive, no sample is stored
+    heights = []
+    positions = [1, 2, 3, 4, 5]
+    desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+    increments = [0, p / 2, p, (1 + p) / 2, 1]
+    estimate = None
+    while True:
+        recv = yield estimate
+        if recv is END_OF_STREAM:
+            break
+        for x in _samples(recv):
+            if len(heights) < 5:
+                bisect.insort(heights, x)
+                estimate = heights[round(p * (len(heights) - 1))]
+                continue
+            if x < heights[0]:
+                heights[0] = x
+                k = 0
+            elif x >= heights[4]:
+                heights[4] = x
+                k = 3
+            else:
+                k = bisect.bisect_right(heights, x) - 1
+            for i in range(k + 1, 5):
+                positions[i] += 1
+            for i in range(5):
+                desired[i] += increments[i]
+            for i in (1, 2, 3):
+                d = desired[i] - positions[i]
+                if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                    d = 1 if d > 0 else -1
+                    parabolic = heights[i] + d / (positions[i + 1] - positions[i - 1]) * (
+                        (positions[i] - positions[i - 1] + d) * (heights[i + 1] - heights[i])
+                        / (positions[i + 1] - positions[i])
+                        + (positions[i + 1] - positions[i] - d) * (heights[i] - heights[i - 1])
+                        / (positions[i] - positions[i - 1])
+                    )
+                    if heights[i - 1] < parabolic < heights[i + 1]:
+                        heights[i] = parabolic
+                    else:  # the parabola overshoots a neighbour, fall back to linear
+                        heights[i] += d * (heights[i + d] - heights[i]) / (positions[i + d] - positions[i])
+                    positions[i] += d
+            estimate = heights[2]
+    return estimate
+
+
+def combined_gen(**aggregators):
+    # fan out: every sample (or batch) goes to every aggregator, the results come back as a dict
+    for aggregator in aggregators.values():
+        aggregator.send(None)
+    results = {name: None for name in aggregators}
+    while True:
+        recv = yield results
+        if recv is END_OF_STREAM:
+            break
+        if not isinstance(recv, Number):
+            recv = list(recv)  # a batch may be a one-shot iterator, every aggregator needs to see it
+        results = {name: aggregator.send(recv) for name, aggregator in aggregators.items()}
+    final = {}
+    for name, aggregator in aggregators.items():
+        try:
+            aggregator.send(END_OF_STREAM)
+        except StopIteration as stop:
+            final[name] = stop.value
+    return final
+
+
+def stats_proxy_gen(make_aggregator, finished):
+    # the delegating generator of (2.2): one aggregator per stream, the final results collected in "finished"
+    while True:
+        ret = yield from make_aggregator()
+        finished.append(ret)
+
+
+stream = [10, 0, 20, 30, 0, 40, 50]  # the zeros are samples now
+stats = welford_gen()
+stats.send(None)
+stats.send(stream[:3])  # a batch
+for x in stream[3:]:
+    current = stats.send(x)  # single samples
+assert math.isclose(current.mean, statistics.mean(stream)) and math.isclose(current.variance, statistics.variance(stream))
+try:
+    stats.send(END_OF_STREAM)
+except StopIteration as stop:
+    print(f'{stop.value=}')
+"""
+stop.value=MeanVariance(count=7, mean=21.42857142857143, variance=380.9523809523809)
+"""
+
+finished_streams = []
+proxy = stats_proxy_gen(lambda: combined_gen(
+    moments=welford_gen(), window=window_mean_gen(3), extremes=minmax_gen(), median=p2_quantile_gen(0.5),
+), finished_streams)
+proxy.send(None)
+proxy.send(stream)
+proxy.send(END_OF_STREAM)  # the first stream ends, the proxy starts a new combined_gen
+proxy.send(range(1, 10_001))
+proxy.send(END_OF_STREAM)
+print(finished_streams[0])
+"""
+{'moments': MeanVariance(count=7, mean=21.42857142857143, variance=380.9523809523809), 'window': 30.0,
+ 'extremes': (0, 50), 'median': 10}
+"""
+# (the exact median is 20: with 7 samples, P-square has barely moved its markers from the first 5)
+assert finished_streams[0]['window'] == statistics.mean(stream[-3:]) and finished_streams[0]['extremes'] == (0, 50)
+assert abs(finished_streams[1]['median'] - 5000.5) < 50  # an estimate, within 1% of the true median here
+
+# the window mean does not drift when a huge sample leaves the window
+window = window_mean_gen(3)
+window.send(None)
+assert window.send([1e16, 1, 1, 1]) == 1.0
+window_samples = [random.uniform(-1e12, 1e12) for _ in range(100_000)]
+assert math.isclose(window.send(window_samples), math.fsum(window_samples[-3:]) / 3, rel_tol=1e-12, abs_tol=1e-3)
+
+random.seed(2)
+samples = [random.gauss(0, 1) for _ in range(100_000)]
+p99 = p2_quantile_gen(0.99)
+p99.send(None)
+estimate = p99.send(samples)
+print(f'p99 estimate {estimate:.4f}, exact {statistics.quantiles(samples, n=100)[-1]:.4f}')
+"""
+p99 estimate 2.3349, exact 2.3354
+"""
+
+# ----APPENDIX---------------------------------------
+# asyncio, yield from: the same chain of stages as asyncio tasks linked by bounded queues is in the
+# "async_pipeline" chapter